@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+asyncio event loop responsiveness while streaming and changing settings on a simulated camera:
+Camera calls made directly from a coroutine versus through AsyncCamera.
+
+A heartbeat task sleeps 1 ms at a time and records how late it wakes (loop lag), while one
+task consumes and demosaics frames and another changes the exposure every 20 ms.
+"""
+
+import asyncio
+import time
+
+import numpy as np
+
+from pysumix import Camera
+from pysumix.aiocamera import AsyncCamera
+from pysumix.demosaic import demosaic
+from pysumix.simulator import SimulatedDLL
+
+
+async def heartbeat(lag: list):
+    while True:
+        tic = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lag.append(time.perf_counter() - tic - 0.001)
+
+
+async def blocking(cam: Camera, nframe: int, setting: list):
+    async def settings():
+        for i in range(1000):
+            tic = time.perf_counter()
+            cam.setExposure(1.0 + 0.01 * (i % 2))
+            setting.append(time.perf_counter() - tic)
+            await asyncio.sleep(0.02)
+
+    task = asyncio.create_task(settings())
+    cam.startStream()
+    for _ in range(nframe):
+        demosaic(cam.grabFrame(), "", 1)
+        await asyncio.sleep(0)
+    cam.stopStream()
+    task.cancel()
+
+
+async def nonblocking(cam: Camera, nframe: int, setting: list):
+    async with AsyncCamera(cam) as acam:
+
+        async def settings():
+            for i in range(1000):
+                tic = time.perf_counter()
+                await acam.setExposure(1.0 + 0.01 * (i % 2))
+                setting.append(time.perf_counter() - tic)
+                await asyncio.sleep(0.02)
+
+        task = asyncio.create_task(settings())
+        async for frame in acam.stream(nframe):
+            demosaic(frame.image, "", 1)
+        task.cancel()
+
+
+async def run(mode, cam: Camera, nframe: int) -> dict[str, float]:
+    lag: list[float] = []
+    setting: list[float] = []
+    beat = asyncio.create_task(heartbeat(lag))
+    tic = time.perf_counter()
+    await mode(cam, nframe, setting)
+    fps = nframe / (time.perf_counter() - tic)
+    beat.cancel()
+
+    return {
+        "fps": fps,
+        "lag_p50_ms": 1e3 * np.percentile(lag, 50),
+        "lag_p99_ms": 1e3 * np.percentile(lag, 99),
+        "lag_max_ms": 1e3 * max(lag),
+        "setting_p50_ms": 1e3 * np.percentile(setting, 50),
+    }
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    p = ArgumentParser(description="asyncio loop lag with blocking vs AsyncCamera calls")
+    p.add_argument("-n", "--nframe", type=int, default=200)
+    p.add_argument("-r", "--fps", help="simulated frame rate", type=float, default=100)
+    p.add_argument(
+        "-l", "--latency", help="simulated control call time [s]", type=float, default=0.005
+    )
+    p.add_argument("-d", "--decim", type=int, default=2)
+    P = p.parse_args()
+
+    for mode in (blocking, nonblocking):
+        cam = Camera(dll=SimulatedDLL(fps=P.fps, nsynth=2, latency=P.latency), decim=P.decim)
+        r = asyncio.run(run(mode, cam, P.nframe))
+        print(f"{mode.__name__:>12}: " + "  ".join(f"{k} {v:8.2f}" for k, v in r.items()))
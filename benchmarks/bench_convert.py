@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Convert.BayerToRgb argument marshalling, with the DLL call itself stubbed out:
+previous per-pixel ctypes array construction versus passing the NumPy buffers directly
+"""
+
+import ctypes as ct
+import time
+
+import numpy as np
+
+from pysumix import Convert
+
+
+class NoopDLL:
+    """stands in for SMXM8X.dll so only the Python side is timed"""
+
+    def CxBayerToRgb(self, inbuf, width, height, alg, outbuf):
+        return 1
+
+
+def previous(img):
+    h, w = img.shape
+    Nbuffer = w * h
+    inbuffer = (ct.c_ubyte * Nbuffer)(*img.ravel(order="C"))
+    outbuffer = (ct.c_ubyte * Nbuffer * 3)()
+    NoopDLL().CxBayerToRgb(
+        ct.byref(inbuffer), ct.c_int32(w), ct.c_int32(h), ct.c_int32(1), ct.byref(outbuffer)
+    )
+    return np.asarray(outbuffer).reshape((h, w, 3), order="C")[..., ::-1]
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    p = ArgumentParser(description="BayerToRgb marshalling benchmark")
+    p.add_argument("-x", "--width", type=int, default=1280)
+    p.add_argument("-y", "--height", type=int, default=1024)
+    p.add_argument("-n", "--repeat", type=int, default=5)
+    P = p.parse_args()
+
+    img = np.random.default_rng(0).integers(0, 256, (P.height, P.width), dtype=np.uint8)
+
+    conv = Convert(dll=NoopDLL())
+    out = np.empty((P.height, P.width, 3), dtype=np.uint8)
+
+    for name, func in (
+        ("previous", lambda: previous(img)),
+        ("zero-copy", lambda: conv.BayerToRgb(img, 1)),
+        ("zero-copy out=", lambda: conv.BayerToRgb(img, 1, out=out)),
+    ):
+        func()
+        tic = time.perf_counter()
+        for _ in range(P.repeat):
+            func()
+        dt = (time.perf_counter() - tic) / P.repeat
+        print(f"{name:>15}: {dt * 1e3:10.3f} ms/frame")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+demosaic throughput for a (N, H, W) stack at full SMX-M8X resolution:
+frame-by-frame Python loop versus one vectorized pass into a preallocated output,
+and that pass split across a thread pool
+"""
+
+import time
+
+import numpy as np
+
+from pysumix.demosaic import demosaic, grbg2rgb
+
+
+def loop(stack, alg, out):
+    for i, f in enumerate(stack):
+        out[i] = grbg2rgb(f, alg)
+
+
+def batched(stack, alg, out):
+    demosaic(stack, "", alg, out=out)
+
+
+def threaded(stack, alg, out):
+    demosaic(stack, "", alg, out=out, workers=P.workers)
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    p = ArgumentParser(description="demosaic benchmark")
+    p.add_argument("-n", "--nframe", help="number of frames", type=int, default=20)
+    p.add_argument("-x", "--width", type=int, default=1280)
+    p.add_argument("-y", "--height", type=int, default=1024)
+    p.add_argument(
+        "-a", "--alg", help="demosaic algorithm(s)", type=int, nargs="+", default=[1, 2]
+    )
+    p.add_argument("-j", "--workers", help="threads, default one per CPU", type=int)
+    P = p.parse_args()
+
+    rng = np.random.default_rng(0)
+    for dtype in (np.uint8, np.uint16):
+        stack = rng.integers(0, 1024 if dtype == np.uint16 else 256, (P.nframe, P.height, P.width))
+        stack = stack.astype(dtype)
+        out = np.empty(stack.shape + (3,), dtype=dtype)
+        for alg in P.alg:
+            for name, func in (("loop", loop), ("batched", batched), ("threaded", threaded)):
+                func(stack[:1], alg, out[:1])  # warm up
+                tic = time.perf_counter()
+                func(stack, alg, out)
+                dt = time.perf_counter() - tic
+                print(
+                    f"{np.dtype(dtype).name:>6} alg {alg} {name:>8}: {P.nframe / dt:8.1f} frames/s"
+                )
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Compare streaming a recording page by page with TiffRecorder against the previous
+single-shot tifffile.imwrite of the whole in-memory stack.
+"""
+
+from pathlib import Path
+import tempfile
+import time
+
+import numpy as np
+import tifffile
+
+from pysumix.record import TiffRecorder
+
+
+def single_shot(fn: Path, frames, compression, level):
+    tifffile.imwrite(
+        fn,
+        frames,
+        compression=compression,
+        compressionargs=None if level is None else {"level": level},
+        photometric="minisblack",
+        extratags=[(33434, "f", 1, 10.0, True), (41991, "f", 4, [1, 2, 3, 4], True)],
+    )
+
+
+def streaming(fn: Path, frames, compression, level):
+    gain = {"g1": 1, "gr": 2, "gg2": 3, "gb": 4}
+    with TiffRecorder(
+        fn, frames.shape[1:], compression=compression, level=level, nframes=len(frames)
+    ) as rec:
+        for i, f in enumerate(frames):
+            rec.append(f, i, time.perf_counter(), exposure=10.0, gain=gain)
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    p = ArgumentParser(description="TIFF writing benchmark")
+    p.add_argument("-n", "--nframe", help="number of frames", type=int, default=100)
+    p.add_argument("-x", "--width", type=int, default=1280)
+    p.add_argument("-y", "--height", type=int, default=1024)
+    P = p.parse_args()
+
+    # smooth scene plus sensor noise, compressible like real frames
+    rng = np.random.default_rng(0)
+    scene = np.add.outer(np.arange(P.height), np.arange(P.width)) // 16 % 200
+    frames = (scene + rng.integers(0, 8, (P.nframe, P.height, P.width))).astype(np.uint8)
+    nbytes = frames.nbytes
+
+    with tempfile.TemporaryDirectory() as d:
+        fn = Path(d) / "bench.tif"
+        for compression, level in ((None, None), ("zlib", 1), ("zlib", 6)):
+            for name, func in (("imwrite stack", single_shot), ("TiffRecorder", streaming)):
+                tic = time.perf_counter()
+                func(fn, frames, compression, level)
+                dt = time.perf_counter() - tic
+                print(
+                    f"{name:>14} {str(compression):>5} level {str(level):>4}: "
+                    f"{P.nframe / dt:8.1f} frames/s  {nbytes / dt / 1e6:8.1f} MB/s  "
+                    f"{fn.stat().st_size / nbytes:6.1%} size"
+                )
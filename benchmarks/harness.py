@@ -0,0 +1,54 @@
+"""
+minimal timing harness shared by the benchmarks: per-call latency percentiles,
+throughput and peak memory allocated per call
+"""
+
+from __future__ import annotations
+
+import time
+import tracemalloc
+from typing import Any, Callable
+
+import numpy as np
+
+
+def measure(
+    func: Callable[[], Any], repeat: int = 20, warmup: int = 2, nbytes: int | None = None
+) -> dict[str, float]:
+    """
+    time repeat calls of func after warmup calls.
+    nbytes: bytes of input processed per call, for MB/s.
+    alloc_kB is the peak memory allocated during one extra traced call
+    (NumPy reports its array allocations to tracemalloc).
+    """
+    for _ in range(warmup):
+        func()
+
+    dt = np.empty(repeat)
+    for i in range(repeat):
+        tic = time.perf_counter()
+        func()
+        dt[i] = time.perf_counter() - tic
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    r = {
+        "calls/s": 1 / dt.mean(),
+        "p50_ms": 1e3 * np.percentile(dt, 50),
+        "p99_ms": 1e3 * np.percentile(dt, 99),
+        "jitter_ms": 1e3 * dt.std(),
+        "alloc_kB": peak / 1024,
+    }
+    if nbytes is not None:
+        r["MB/s"] = nbytes / dt.mean() / 1e6
+
+    return r
+
+
+def report(name: str, r: dict[str, float]):
+    cols = "  ".join(f"{k} {v:9.2f}" for k, v in r.items())
+    print(f"{name:<40} {cols}")
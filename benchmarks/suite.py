@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Acquisition pipeline benchmark suite, runnable without hardware (simulated camera).
+
+Every stage is timed per frame at the SMX-M8X full resolution 1280x1024 divided by each
+requested decimation, reporting calls/s, p50/p99 latency, jitter and peak allocation per call.
+
+    python benchmarks/suite.py
+    python benchmarks/suite.py -d 1 2 4 -k demosaic --json bench.json
+"""
+
+from pathlib import Path
+import itertools
+import json
+import tempfile
+
+import numpy as np
+
+from pysumix import Camera, Convert
+from pysumix.binning import binning
+from pysumix.demosaic import demosaic
+from pysumix.lut import make_lut, apply_lut
+from pysumix.record import H5Recorder, TiffRecorder, RawRecorder
+from pysumix.rgb2gray import rgb2gray
+from pysumix.simulator import SimulatedDLL
+from pysumix.stats import framestats
+
+from harness import measure, report
+
+WIDTH = 1280
+HEIGHT = 1024
+
+
+class NoopDLL:
+    """CxBayerToRgb that returns at once, so only argument marshalling is timed"""
+
+    def CxBayerToRgb(self, inbuf, width, height, alg, outbuf):
+        return 1
+
+
+def mosaic(h: int, w: int, dtype) -> np.ndarray:
+    top = 1023 if dtype == np.uint16 else 255
+    return np.random.default_rng(0).integers(0, top + 1, (h, w)).astype(dtype)
+
+
+def cases(decim: int, tmpdir: Path, slow: bool):
+    """yield (name, function, bytes processed per call)"""
+    h = HEIGHT // decim
+    w = WIDTH // decim
+    res = f"{w}x{h}"
+
+    # %% camera, simulated with a 0.1 ms frame period so the host side dominates
+    cam = Camera(dll=SimulatedDLL(fps=1e4, nsynth=2), decim=decim)
+    cam.setExposure(0.1)
+    cam.startStream()
+    yield f"grabFrame ring {res}", cam.grabFrame, h * w
+    out = np.empty((h, w), dtype=np.uint8)
+    yield f"grabFrame out= {res}", lambda: cam.grabFrame(out=out), h * w
+    cam.stopStream()
+
+    frames = cam.frames(maxsize=8)
+    yield f"frames() background {res}", lambda: next(frames), h * w
+    frames.close()
+
+    # %% image processing
+    for dtype in (np.uint8, np.uint16):
+        img = mosaic(h, w, dtype)
+        name = np.dtype(dtype).name
+        rgb = np.empty((h, w, 3), dtype=dtype)
+        for alg in (1, 2, 3) if slow else (1, 2):
+            yield (
+                f"demosaic alg {alg} {name} {res}",
+                lambda img=img, alg=alg, rgb=rgb: demosaic(img, "", alg, out=rgb),
+                img.nbytes,
+            )
+        for alg in (1, 2):
+            yield (
+                f"demosaic gray alg {alg} {name} {res}",
+                lambda img=img, alg=alg: demosaic(img, "", alg, color=False),
+                img.nbytes,
+            )
+        yield f"rgb2gray {name} {res}", lambda rgb=rgb: rgb2gray(rgb), rgb.nbytes
+        gray = np.empty((h, w), dtype=dtype)
+        scratch = np.empty((2, h, w), dtype=np.uint32)
+        yield (
+            f"rgb2gray out= {name} {res}",
+            lambda rgb=rgb, gray=gray, scratch=scratch: rgb2gray(rgb, gray, scratch),
+            rgb.nbytes,
+        )
+
+        for step in (1, 2):
+            yield (
+                f"framestats step {step} {name} {res}",
+                lambda img=img, step=step: framestats(img, step=step),
+                img.nbytes,
+            )
+        for mode in ("bayer", "rgb", "gray"):
+            binned = binning(img, 2, mode)
+            yield (
+                f"binning 2x2 {mode} {name} {res}",
+                lambda img=img, mode=mode, binned=binned: binning(img, 2, mode, out=binned),
+                img.nbytes,
+            )
+
+    raw10 = mosaic(h, w, np.uint16)
+    table = make_lut(gamma=2.2)
+    out8 = np.empty((h, w), dtype=np.uint8)
+    yield f"10->8 bit LUT {res}", lambda: apply_lut(raw10, table, out8), raw10.nbytes
+
+    img = mosaic(h, w, np.uint8)
+    conv = Convert(dll=NoopDLL())
+    bgr = np.empty((h, w, 3), dtype=np.uint8)
+    yield f"BayerToRgb marshalling {res}", lambda: conv.BayerToRgb(img, 1, out=bgr), img.nbytes
+
+    # %% disk writing, one frame per call
+    counter = itertools.count()
+    gain = {"g1": 1, "gr": 1, "gg2": 1, "gb": 1}
+    for compression in ("none", "lzf"):
+        rec = H5Recorder(tmpdir / f"bench_{compression}.h5", (h, w), compression=compression)
+        yield (
+            f"H5Recorder {compression} {res}",
+            lambda rec=rec: rec.append(img, next(counter), 0.0, 10.0, gain),
+            img.nbytes,
+        )
+        rec.close()
+
+    for codec, level in ((None, None), ("zlib", 1)):
+        trec = TiffRecorder(tmpdir / "bench.tif", (h, w), compression=codec, level=level)
+        yield (
+            f"TiffRecorder {codec} {res}",
+            lambda trec=trec: trec.append(img, next(counter), 0.0, 10.0, gain),
+            img.nbytes,
+        )
+        trec.close()
+
+    rrec = RawRecorder(tmpdir / "bench.raw", (h, w))
+    yield (
+        f"RawRecorder {res}",
+        lambda: rrec.append(img, next(counter), 0.0, 10.0, gain),
+        img.nbytes,
+    )
+    rrec.close()
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    p = ArgumentParser(description="pysumix acquisition pipeline benchmarks")
+    p.add_argument("-d", "--decim", help="decimation(s)", type=int, nargs="+", default=[1, 2])
+    p.add_argument("-n", "--repeat", help="timed calls per case", type=int, default=20)
+    p.add_argument("-k", help="only run cases containing this text")
+    p.add_argument("--slow", help="include the spline (alg 3) demosaic", action="store_true")
+    p.add_argument("--json", help="also write results to this JSON file")
+    P = p.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as d:
+        for decim in P.decim:
+            for name, func, nbytes in cases(decim, Path(d), P.slow):
+                if P.k and P.k not in name:
+                    continue
+                results[name] = measure(func, P.repeat, nbytes=nbytes)
+                report(name, results[name])
+
+    if P.json:
+        Path(P.json).expanduser().write_text(json.dumps(results, indent=2))
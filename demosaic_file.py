@@ -17,7 +17,7 @@ def readimages(fn):
         import h5py
 
         with h5py.File(fn, mode="r") as f:
-            data = f["/images"].value
+            data = f["/images"][:]
     else:
         data = imageio.imread(fn)
 
@@ -37,13 +37,13 @@ def readimages(fn):
     return data
 
 
-def showimages(data, demosalg):
+def showimages(data, demosalg, workers=1):
     fg = figure()
     ax = fg.gca()
     # without vmin, vmax it doesn't show anything!
     # hi = ax.imshow(empty((ddim[1],ddim[2],3), dtype=uint8), vmin=0, vmax=255)
     # ht = ax.set_title('')
-    proc = demosaic(data, demosalg, 1, False)
+    proc = demosaic(data, demosalg, 1, False, workers=workers)
     if proc is None:
         return
 
@@ -70,10 +70,13 @@ if __name__ == "__main__":
 
     p = ArgumentParser(description="demosaicking test")
     p.add_argument("file", help="file to load")
+    p.add_argument(
+        "-j", "--workers", help="demosaic threads, 0 for one per CPU", type=int, default=1
+    )
     a = p.parse_args()
 
     data = readimages(a.file)  # DON'T squeeze, so that we can iterate
     # showimages(data,'ours')
 
-    showimages(data, "")
+    showimages(data, "", a.workers or None)
     show()
@@ -12,10 +12,19 @@ import numpy as np
 from pathlib import Path
 import os
 import logging
+import contextlib
+import itertools
+import threading
 
 #
 from pysumix import Camera
+from pysumix.binning import binned_shape, bindtype, binning
 from pysumix.demosaic import demosaic
+from pysumix.record import H5Recorder, TiffRecorder, RawRecorder
+from pysumix.simulator import SimulatedDLL
+from pysumix.metrics import Metrics
+from pysumix.preview import Preview
+from pysumix.stats import framestats
 
 #
 if os.name == "nt":
@@ -33,53 +42,50 @@ def main(
     tenbit: bool,
     preview: bool,
     verbose: bool = False,
+    ofn: Path | None = None,
+    dll=None,
+    metrics: Metrics | None = None,
+    stats: bool = False,
+    nbin: int = 1,
 ) -> tuple:
     # %% setup camera class
     cam = Camera(
-        w, h, decim, tenbit, verbose=verbose
+        w, h, decim, tenbit, verbose=verbose, dll=dll, metrics=metrics
     )  # creates camera object and opens connection
 
-    if verbose > 0:
-        cdetex = cam.getCameraInfoEx()
-        print("model", cdetex.HWModelID, "HWversion", cdetex.HWVersion, "serial", cdetex.HWSerial)
-    # %% sensor configuration
-    cam.setFrequency(1)  # set to 24MHz (fastest)
-    if verbose > 0:
-        print("camera sensor frequency", cam.getFrequency())  # str() in case it's NOne
-
-    if verbose > 1:
-        emin, emax = cam.getExposureMinMax()
-        print("camera exposure min, max [ms] = {:.3f}, {:.1f}".format(emin, emax))
-
-    cam.setExposure(expos)
-    exptime = cam.getExposure()
-    print("exposure is {:0.3f}".format(exptime) + " ms.")
-
-    rgain = cam.setAllGain(gain)
-    # %% setup figure (for loter plotting)
-    if preview:
-        figure(1).clf()
-        fgrw = figure(1)
-        axrw = fgrw.gca()
-        hirw = axrw.imshow(
-            np.empty((cam.ypix, cam.xpix), dtype=np.uint8),
-            origin="upper",  # this is consistent with Sumix chip and tiff
-            vmin=0,
-            vmax=256,
-            cmap="gray",
-        )
-    else:
-        hirw = None
-    # %% start acquisition
-    cam.startStream()
-    if nframe is None:
-        frames = freewheel(cam, color, hirw)
-    elif 0 < nframe < 200:
-        frames = fixedframe(nframe, cam, color, hirw)
-    else:
-        raise ValueError("I dont know what to do with nframe={:d}".format(nframe))
-    # %% shutdown camera
-    cam.stopStream()
+    # one device session for configuration and acquisition
+    with cam:
+        if verbose > 0:
+            cdetex = cam.getCameraInfoEx()
+            print(
+                "model", cdetex.HWModelID, "HWversion", cdetex.HWVersion, "serial", cdetex.HWSerial
+            )
+        # %% sensor configuration, in one transaction; frequency 1 is 24MHz (fastest)
+        cam.configure(exposure=expos, gain=gain, frequency=1)
+        # read back from the camera's shadow state, not over USB
+        if verbose > 0:
+            print("camera sensor frequency", cam.getFrequency())  # str() in case it's NOne
+
+        if verbose > 1:
+            emin, emax = cam.getExposureMinMax()
+            print("camera exposure min, max [ms] = {:.3f}, {:.1f}".format(emin, emax))
+
+        exptime = cam.getExposure()
+        print("exposure is {:0.3f}".format(exptime) + " ms.")
+
+        rgain = cam.getGain()
+        # %% start acquisition
+        cam.startStream()
+        if ofn is not None:
+            frames = record(ofn, nframe, cam, exptime, rgain, color, preview, stats, nbin)
+        elif nframe is None:
+            frames = freewheel(cam, color, preview)
+        elif 0 < nframe < 200:
+            frames = fixedframe(nframe, cam, color, preview)
+        else:
+            raise ValueError("I dont know what to do with nframe={:d}".format(nframe))
+        # %% shutdown camera
+        cam.stopStream()
 
     return frames, exptime, rgain
 
@@ -87,100 +93,177 @@ def main(
 # %% ===========================
 
 
-def freewheel(cam, color: bool, hirw):
-    try:
-        if os.name == "nt":
-            print("press Escape or Space to abort")
-        while True:
-            frame = cam.grabFrame()
-            if frame is None:
-                logging.error("aborting acqusition due to camera communication problem")
-                break
+def timed(cam, stage: str):
+    """time a block as stage when tracing is on"""
+    return contextlib.nullcontext() if cam.metrics is None else cam.metrics.stage(stage)
 
-            if color:
-                frame = demosaic(frame, "")
 
-            if hirw is not None:
-                hirw.set_data(frame.astype(np.uint8))
-                draw()
-                pause(0.001)
+def withpreview(acq, cam, color: bool, enabled: bool, consume):
+    """
+    run the frame loop consume(). With preview, it runs on a worker thread while this (GUI)
+    thread draws the newest frames, prepared on the preview's own thread at a capped rate,
+    so drawing never delays the frame loop or the grab thread.
+    """
+    if not enabled:
+        return consume()
+
+    result: dict = {}
+
+    def work():
+        try:
+            result["frames"] = consume()
+        except BaseException as e:
+            result["error"] = e
+
+    worker = threading.Thread(target=work, name="demo-consume", daemon=True)
+    with Preview(acq, color=color) as pv:
+        fg = figure(1)
+        fg.clf()
+        hi = fg.gca().imshow(
+            pv.blank(),
+            origin="upper",  # this is consistent with Sumix chip and tiff
+            vmin=0,
+            vmax=255,
+            cmap="gray",
+        )
+        worker.start()
+        try:
+            while worker.is_alive():
+                with timed(cam, "preview"):
+                    pv.show(hi)
+                pause(pv.period)  # GUI events until the next preview frame
+        finally:
+            # Ctrl-C lands here on the main thread: stopping acquisition ends the frame loop
+            acq.stop()
+            worker.join()
+
+    print("preview showed", pv.shown, "frames")
+    if "error" in result:
+        raise result["error"]
+    return result.get("frames")
+
+
+def freewheel(cam, color: bool, preview: bool):
+    # grab on a background thread; if the loop falls behind, keep the newest frames
+    acq = cam.acquire(policy="drop-oldest")
+
+    def consume():
+        frame = None
+        for frame, _, _ in acq:
+            if color:
+                frame = demosaic(frame, "", metrics=cam.metrics)
 
             if os.name == "nt" and kbhit():
                 keyputf = getwch()
                 if keyputf == "\x1b" or keyputf == " ":
                     print("halting acquisition due to user keypress")
                     break
+        else:
+            if acq.error is not None:
+                logging.error("aborting acqusition due to camera communication problem")
+        return frame
 
+    frame = None
+    try:
+        if os.name == "nt":
+            print("press Escape or Space to abort")
+        frame = withpreview(acq, cam, color, preview, consume)
     except KeyboardInterrupt:
         print("halting acquisition")
+    finally:
+        acq.stop()
+        print("frames", acq.stats())
 
     return frame
 
 
-def fixedframe(nframe: int, cam, color: bool, hirw):
+def fixedframe(nframe: int, cam, color: bool, preview: bool):
     if color:
-        frames = np.empty((nframe, cam.ypix, cam.xpix, 3), dtype=np.uint8)
+        frames = np.empty((nframe, cam.ypix, cam.xpix, 3), dtype=cam.dtype)
     else:
-        frames = np.empty((nframe, cam.ypix, cam.xpix), dtype=np.uint8)
-
-    try:
-        for i in range(nframe):
-            frame = cam.grabFrame()
+        frames = np.empty((nframe, cam.ypix, cam.xpix), dtype=cam.dtype)
 
+    def consume():
+        for i, (frame, _, _) in zip(range(nframe), acq):
             if color:
-                frames[i, ...] = demosaic(frame, "", color=color)
+                frames[i, ...] = demosaic(frame, "", color=color, metrics=cam.metrics)
             else:
                 frames[i, ...] = frame
 
-            if hirw is not None:
-                hirw.set_data(frames[i, ...].astype(np.uint8))
-                # hirw.cla()
-                # hirw.imshow(dframe)
-                draw()
-                pause(0.001)
+    try:
+        with cam.acquire() as acq:
+            withpreview(acq, cam, color, preview, consume)
     except KeyboardInterrupt:
         print("halting acquisition per user Ctrl-C")
 
     return frames
 
 
-def saveframes(ofn: Path, frames, color: bool, exptime: float, gain: dict[str, int]):
-    if ofn is not None and frames is not None:
-        ext = Path(ofn).expanduser().suffix.lower()
-        if ext[:4] == ".tif":
-            import tifffile
-
-            print("write", ofn)
-
-            pho = "rgb" if color else "minisblack"
-
-            tifffile.imwrite(
-                ofn,
-                frames,
-                compression=6,
-                photometric=pho,
-                description=(
-                    "exposure_sec {:0.3f}".format(exptime / 1000)
-                    + ",  gains_(g1 red g2 blue) "
-                    + str(list(gain.values()))
-                ),
-                extratags=[
-                    (33434, "f", 1, exptime, True),
-                    (41991, "f", 4, list(gain.values()), True),
-                ],
-            )
-            # (65002,'f',2,[123456.789,9876.54321],True)])
-
-        elif ext == ".h5":
-            import h5py
+def record(
+    ofn: Path,
+    nframe: int | None,
+    cam,
+    exptime: float,
+    gain: dict[str, int],
+    color: bool = False,
+    preview: bool = False,
+    stats: bool = False,
+    nbin: int = 1,
+):
+    """
+    stream raw frames to HDF5, multipage TIFF or a raw memory-mappable file as they arrive,
+    without a limit on the number of frames.
+    stats: per-channel frame statistics alongside each HDF5 frame
+    nbin: record nbin x nbin Bayer-binned frames, still GRBG, in a wider dtype
+    """
+    ext = Path(ofn).expanduser().suffix.lower()
+    if stats and ext != ".h5":
+        raise ValueError("frame statistics are recorded to .h5 files only")
+
+    shape: tuple[int, ...] = (cam.ypix, cam.xpix)
+    dtype = cam.dtype
+    bits = cam.bits
+    binned = None
+    if nbin > 1:
+        shape = binned_shape(shape, nbin)
+        dtype = bindtype(dtype, nbin)
+        bits += int(np.ceil(np.log2(nbin * nbin)))
+        binned = np.empty(shape, dtype=dtype)
+
+    rec: H5Recorder | TiffRecorder | RawRecorder
+    if ext == ".h5":
+        rec = H5Recorder(ofn, shape, dtype)
+    elif ext[:4] == ".tif":
+        rec = TiffRecorder(ofn, shape, dtype, nframes=nframe or None)  # classic TIFF if it fits
+    elif ext == ".raw":
+        rec = RawRecorder(ofn, shape, dtype, bits, cam.decim * nbin, cam.startx, cam.starty)
+    else:
+        raise ValueError(f"unknown file type {ofn}, use .h5, .tif or .raw")
+
+    def consume():
+        for _, (image, counter, timestamp) in zip(
+            range(nframe) if nframe else itertools.count(), acq
+        ):
+            if binned is not None:
+                with timed(cam, "binning"):
+                    image = binning(image, nbin, out=binned)
+            kw = {}
+            if stats:
+                with timed(cam, "stats"):
+                    kw["stats"] = framestats(image, bits, cam.color)
+            with timed(cam, "write"):
+                rec.append(image, counter, timestamp, exposure=exptime, gain=gain, **kw)
+
+    print("recording to", ofn)
+    try:
+        with rec, cam.acquire() as acq:
+            withpreview(acq, cam, color, preview, consume)
+    except KeyboardInterrupt:
+        print("halting acquisition per user Ctrl-C")
 
-            with h5py.File(ofn, "w") as f:
-                fimg = f.create_dataset("/images", data=frames, compression="gzip")
-                fimg.attrs["CLASS"] = np.bytes_("IMAGE")
-                fimg.attrs["IMAGE_VERSION"] = np.bytes_("1.2")
-                fimg.attrs["IMAGE_SUBCLASS"] = np.bytes_("IMAGE_GRAYSCALE")
-                fimg.attrs["DISPLAY_ORIGIN"] = np.bytes_("LL")
-                fimg.attrs["IMAGE_WHITE_IS_ZERO"] = np.uint8(0)
+    print("wrote", rec.nframes, "frames to", ofn)
+    # frames are on disk, not in memory
+    return None
 
 
 # %%
@@ -194,11 +277,14 @@ if __name__ == "__main__":
         help="use Bayer demosaic for color (display only, disk writing is raw)",
         action="store_true",
     )
-    p.add_argument("-d", "--decim", help="decimation (binning)", type=int)
+    p.add_argument("-d", "--decim", help="camera decimation (skips pixels)", type=int)
+    p.add_argument(
+        "-b", "--bin", help="sum NxN sites per color on the host before recording", type=int
+    )
     p.add_argument("-e", "--exposure", help="exposure set [ms]", type=float)
     p.add_argument("-n", "--nframe", help="number of images to acquire", type=int)
     p.add_argument("-g", "--gain", help="set gain for all channels", type=int)
-    p.add_argument("-f", "--file", help="name of tiff file to save (non-demosaiced)")
+    p.add_argument("-f", "--file", help="raw frames to .h5, .tif or .raw file (non-demosaiced)")
     p.add_argument("-x", "--width", help="width in pixels of ROI", type=int)
     p.add_argument("-y", "--height", help="height in pixels of ROI", type=int)
     p.add_argument(
@@ -207,13 +293,25 @@ if __name__ == "__main__":
     p.add_argument(
         "-p", "--preview", help="shows live preview of images acquired", action="store_true"
     )
+    p.add_argument(
+        "-s",
+        "--simulate",
+        help="use the simulated camera instead of the Sumix DLL (no hardware needed)",
+        action="store_true",
+    )
+    p.add_argument("--trace", help="write per-frame stage timing trace to .csv or .json file")
+    p.add_argument(
+        "--stats", help="record per-channel mean, max, saturation, histogram", action="store_true"
+    )
     p.add_argument(
         "-v", "--verbose", help="more verbose feedback to user console", action="count", default=0
     )
     P = p.parse_args()
 
     if P.preview:
-        from matplotlib.pyplot import figure, draw, pause
+        from matplotlib.pyplot import figure, pause
+
+    metrics = Metrics() if P.trace else None
 
     frames, exptime, gain = main(
         P.width,
@@ -226,6 +324,14 @@ if __name__ == "__main__":
         P.tenbit,
         P.preview,
         P.verbose,
+        P.file,
+        SimulatedDLL() if P.simulate else None,
+        metrics,
+        P.stats,
+        P.bin or 1,
     )
 
-    saveframes(P.file, frames, P.color, exptime, gain)
+    if metrics is not None:
+        for stage, stats in metrics.summary().items():
+            print(stage, ", ".join(f"{k} {v:.2f}" for k, v in stats.items()))
+        metrics.save(P.trace)
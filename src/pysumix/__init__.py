@@ -14,7 +14,14 @@ import ctypes as ct
 import numpy as np
 import logging
 import functools
+import contextlib
+import itertools
 import struct
+from collections.abc import Generator
+
+from .acquire import Acquisition, Frame
+from .lut import make_lut, apply_lut
+from .metrics import Metrics
 
 MACHINE_ARCHITECTURES = {
     0x014C: "32-bit",
@@ -67,6 +74,26 @@ def get_dll_architecture(file: Path | str) -> str:
         )
 
 
+def load_dll(dll=None):
+    """
+    load the Sumix DLL from a path (default: installed location).
+    Any other object is taken to be a backend implementing the Cx* calls.
+    """
+    if dll is None:
+        dll = get_dll_path()
+
+    if not isinstance(dll, (str, Path)):
+        return dll
+
+    dll = Path(dll)
+    if dll.is_file():
+        print("using", dll)
+    else:
+        raise ImportError(f"could not find driver file {dll}")
+
+    return ct.windll.LoadLibrary(str(dll))  # type: ignore
+
+
 class Camera:
     def __init__(
         self,
@@ -79,24 +106,54 @@ class Camera:
         mirrorv: int | None = None,
         mirrorh: int | None = None,
         verbose: bool = False,
-        dll: Path | None = None,
+        dll=None,
+        nring: int = 4,
+        metrics: Metrics | None = None,
+        cid: int | None = None,
     ) -> None:
-        if dll is None:
-            dll = get_dll_path()
-
-        if dll.is_file():
-            print("using", dll)
-        else:
-            raise ImportError(f"could not find driver file {dll}")
-
-        self.dll = ct.windll.LoadLibrary(dll)  # type: ignore
+        """
+        dll: path to SMXM8X.dll (default: installed location), or an object implementing
+        the Cx* calls, such as pysumix.simulator.SimulatedDLL
+        metrics: optional pysumix.metrics.Metrics recording grab timing and frame events
+        cid: device id passed to CxOpenDevice, to pick one of several cameras
+        """
+        self.dll = load_dll(dll)
+        self.cid = cid
+        self.metrics = metrics
         self.isopen = False
         self.h = None
-
-        # self.info = self.getCameraInfo() #This function can cause crashes
-        # %% enact initialized settings from abvoe
-        self.setParams(width, height, decim, startx, starty, mirrorv, mirrorh)
-
+        self.streaming = False
+        self._nsession = 0
+        # brightness, contrast, gamma last set; None until set from here
+        self._bcg: tuple[int, int, int] | None = None
+        self._convtab: dict = {}
+        self._lut: dict = {}
+        # shadow of the last known camera settings, see invalidate()
+        self._state: dict = {}
+
+        # one device session for all the setup round trips below
+        with self.session():
+            # self.info = self.getCameraInfo() #This function can cause crashes
+            # %% enact initialized settings from abvoe
+            self.setParams(width, height, decim, startx, starty, mirrorv, mirrorh)
+            self.set10BitsOutput(1 if tenbit else 0)
+            self.verbose = verbose
+            self._sync(nring)
+
+            print("ROI width,height =", self.xpix, self.ypix)
+            if verbose > 1:
+                print("color depth " + str(self.getParams().ColorDeep))
+
+            if self.tenbit == 1:
+                print(" TEN BIT mode enabled")
+            elif verbose > 1:
+                print(" EIGHT BIT mode enabled")
+
+    def _sync(self, nring: int | None = None):
+        """
+        frame geometry, bit depth and frame buffers from the shadow screen params and
+        bit mode; the ring is reallocated if the frame size or dtype changed
+        """
         cpr = self.getParams()
         self.decim = cpr.Decimation
         self.xpix = cpr.Width // cpr.Decimation
@@ -105,29 +162,83 @@ class Camera:
         self.mirrorh = cpr.MirrorH
         self.startx = cpr.StartX
         self.starty = cpr.StartY
-        self.verbose = verbose
 
-        print("ROI width,height =", self.xpix, self.ypix)
         self.color = cpr.ColorDeep == 24
-        if verbose > 1:
-            print("color depth " + str(cpr.ColorDeep))
-
         if self.color:
             self.maxgain = 160
         else:  # monochrome camera
             self.maxgain = 47
 
-        # %% 8/10 bit setup
-        if tenbit:  # FIXME just convert bool to byte instead
-            self.set10BitsOutput(1)
-        else:
-            self.set10BitsOutput(0)
-
         self.tenbit = self.get10BitsOutput()
-        if self.tenbit == 1:
-            print(" TEN BIT mode enabled")
-        elif verbose > 1:
-            print(" EIGHT BIT mode enabled")
+        # 10-bit pixels arrive as 2-byte words, so frames are uint16 end to end
+        self.bits = 10 if self.tenbit == 1 else 8
+        self.dtype = np.dtype(np.uint16 if self.bits == 10 else np.uint8)
+
+        if nring is None:
+            nring = len(self._ring)
+            if self._ring[0].shape == (self.ypix, self.xpix) and self._ring[0].dtype == self.dtype:
+                return
+        self._allocRing(nring)
+
+    # %% settings
+
+    def configure(
+        self,
+        width: int | None = None,
+        height: int | None = None,
+        decim: int | None = None,
+        startx: int | None = None,
+        starty: int | None = None,
+        mirrorv: int | None = None,
+        mirrorh: int | None = None,
+        exposure: float | None = None,
+        gain: int | None = None,
+        frequency: int | None = None,
+        tenbit: bool | None = None,
+    ):
+        """
+        apply any of these settings as one transaction: a single device session, and one
+        CxSetScreenParams + CxActivateScreenParams for ROI, decimation and mirroring.
+        Settings left as None are unchanged. Read back with the get* methods, which are
+        then served from the shadow state without a USB round trip.
+        Changing ROI, decimation or frequency without an exposure makes the next
+        getExposure() read the camera, as the exposure in ms may have changed with them.
+
+        Frame size and bit depth can't change while streaming.
+        """
+        geometry = (width, height, decim, startx, starty, mirrorv, mirrorh)
+        reshape = any(v is not None for v in geometry) or tenbit is not None
+        if reshape and self.streaming:
+            raise RuntimeError("stop the stream before changing frame size or bit depth")
+
+        with self.session():
+            if any(v is not None for v in geometry):
+                self.setParams(*geometry)
+            if tenbit is not None:
+                self.set10BitsOutput(1 if tenbit else 0)
+            if frequency is not None:
+                self.setFrequency(frequency)
+            if exposure is not None:
+                self.setExposure(exposure)
+            if gain is not None:
+                self.setAllGain(gain)
+            if reshape:
+                self._sync()
+
+    def invalidate(self, *names: str):
+        """
+        forget shadow camera settings, by default all of them
+        ("params", "exposure", "gain", "frequency", "tenbit", and "convtab" for the cached
+        conversion tables and the to8bit lookup tables made from them), so the next call
+        reads the camera. Needed only if something else changed the camera.
+        """
+        if not names or "convtab" in names:
+            self._convtab.clear()
+            self._lut.clear()
+        if not names:
+            self._state.clear()
+        for name in names:
+            self._state.pop(name, None)
 
     # %%
 
@@ -143,7 +254,8 @@ class Camera:
     ):  # Set camera params
         old = self.getParams()
 
-        params = _TFrameParams()
+        # starting from the current params keeps the fields not set here, such as ColorDeep
+        params = _TFrameParams.from_buffer_copy(old)
         if startx is not None and startx >= 0:
             params.StartX = ct.c_int32(startx)
         else:
@@ -180,23 +292,29 @@ class Camera:
             params.MirrorH = ct.c_byte(old.MirrorH)
 
         self.openCamera()
+        # exposure in ms depends on the row time, which the ROI width and decimation change
+        self.invalidate("exposure")
         rc = self.dll.CxSetScreenParams(self.h, ct.byref(params))
         if rc == 0:
+            self.invalidate("params")
             raise RuntimeError("CxSetScreenParams: problem setting parameter choices")
         else:
             rc = self.dll.CxActivateScreenParams(self.h)
             if rc == 0:
+                self.invalidate("params")
                 raise RuntimeError("CxActivateScreenParams: Problem activating parameters")
 
-        self.closeCamera()
+        # read back on the open handle: the camera may adjust the requested ROI
+        self.getParams(cached=False)
+        self._release()
 
     # %%
 
     def openCamera(self, cid=None):  # attempt initial connection to camera
         if not self.isopen:
-            self.h = self.dll.CxOpenDevice(cid)
+            self.h = self.dll.CxOpenDevice(self.cid if cid is None else cid)
         if self.h == -1:
-            raise TypeError(f"Camera not found on open attempt with {get_dll_path()}")
+            raise TypeError(f"Camera not found on open attempt with {self.dll}")
         else:
             self.isopen = True
 
@@ -212,6 +330,37 @@ class Camera:
             self.h = None
         self.isopen = False
 
+    def _release(self):
+        """close the device after a call, unless a session or the stream holds it open"""
+        if not self._nsession and not self.streaming:
+            self.closeCamera()
+
+    @contextlib.contextmanager
+    def session(self):
+        """
+        keep one device handle open for every call made inside the block,
+        instead of CxOpenDevice/CxCloseDevice around each call.
+        Sessions nest; the device closes when the outermost one exits.
+        """
+        self.openCamera()
+        self._nsession += 1
+        try:
+            yield self
+        finally:
+            self._nsession -= 1
+            self._release()
+
+    def __enter__(self):
+        self.openCamera()
+        self._nsession += 1
+        return self
+
+    def __exit__(self, *exc):
+        if self.streaming:
+            self.stopStream()
+        self._nsession -= 1
+        self._release()
+
     # %%
 
     def setFrequency(self, freqbyte: int):
@@ -223,20 +372,27 @@ class Camera:
             raise ValueError("I can only accept 1->24MHz or 0->12MHz to set sensor frequency")
 
         self.openCamera()
+        self.invalidate("exposure")  # the pixel clock sets the row time, hence exposure in ms
         rc = self.dll.CxSetFrequency(self.h, freq)  # not ct.byref()
         if rc == 0:
             logging.error("CxSetFrequency: Unable to set sensor frequency ")
-        self.closeCamera()
+            self.invalidate("frequency")
+        else:
+            self._state["frequency"] = freqbyte
+        self._release()
 
-    def getFrequency(self):
-        freq = ct.c_byte()
-        self.openCamera()
-        rc = self.dll.CxGetFrequency(self.h, ct.byref(freq))
-        self.closeCamera()
-        if rc == 0:
-            raise RuntimeError("CxGetFrequency: Unable to get sensor frequency")
+    def getFrequency(self, cached: bool = True):
+        if cached and "frequency" in self._state:
+            freq = self._state["frequency"]
+        else:
+            cfreq = ct.c_byte()
+            self.openCamera()
+            rc = self.dll.CxGetFrequency(self.h, ct.byref(cfreq))
+            self._release()
+            if rc == 0:
+                raise RuntimeError("CxGetFrequency: Unable to get sensor frequency")
 
-        freq = freq.value
+            freq = self._state["frequency"] = cfreq.value
 
         if freq == 0:
             return "12 MHz"
@@ -252,20 +408,24 @@ class Camera:
         emax = ct.c_float()
         self.openCamera()
         rc = self.dll.CxGetExposureMinMaxMs(self.h, ct.byref(emin), ct.byref(emax))
-        self.closeCamera()
+        self._release()
         if rc == 0:
             raise RuntimeError("CxGetExposureMinMaxMs: Unable to get min/max exposure")
 
         return emin.value, emax.value
 
-    def getExposure(self) -> float:  # get comera exposure in milliseconds
+    def getExposure(self, cached: bool = True) -> float:  # get comera exposure in milliseconds
+        if cached and "exposure" in self._state:
+            return self._state["exposure"]
+
         exp = ct.c_float()
         self.openCamera()
         rc = self.dll.CxGetExposureMs(self.h, ct.byref(exp))
-        self.closeCamera()
+        self._release()
         if rc == 0:
             raise RuntimeError("CxGetExposureMs: Unable to get exposure")
 
+        self._state["exposure"] = exp.value
         return exp.value
 
     def setExposure(self, expreq: float):  # set comera exposure in milliseconds
@@ -276,13 +436,19 @@ class Camera:
             exp = ct.c_float()
             self.openCamera()
             rc = self.dll.CxSetExposureMs(self.h, ct.c_float(expreq), ct.byref(exp))
-            self.closeCamera()
+            self._release()
             if rc == 0:
+                self.invalidate("exposure")
                 raise RuntimeError("CxSetExposureMs: Unable to set exposure=" + str(expreq))
+            # the exposure the camera actually set
+            self._state["exposure"] = exp.value
 
     # %%
 
-    def getGain(self) -> dict[str, int]:
+    def getGain(self, cached: bool = True) -> dict[str, int]:
+        if cached and "gain" in self._state:
+            return dict(self._state["gain"])
+
         gg1 = ct.c_int32()
         gr = ct.c_int32()
         gg2 = ct.c_int32()
@@ -290,11 +456,13 @@ class Camera:
 
         self.openCamera()
         rc = self.dll.CxGetGain(self.h, ct.byref(gg1), ct.byref(gr), ct.byref(gg2), ct.byref(gb))
-        self.closeCamera()
+        self._release()
         if rc == 0:
             raise RuntimeError("CxGetGain: could not read gain.")
 
-        return {"g1": gg1.value, "gr": gr.value, "gg2": gg2.value, "gb": gb.value}
+        gain = {"g1": gg1.value, "gr": gr.value, "gg2": gg2.value, "gb": gb.value}
+        self._state["gain"] = gain
+        return dict(gain)
 
     def setGain(self, greq: int) -> dict[str, int]:
         """
@@ -311,12 +479,14 @@ class Camera:
 
         self.openCamera()
         rc = self.dll.CxSetGain(self.h, gg1, gr, gg2, gb)
-        self.closeCamera()
+        self._release()
 
         if rc == 0:
+            self.invalidate("gain")
             raise RuntimeError("CxSetGain: could not set gain.")
 
-        # confirm gain setting
+        # gain setting, from the shadow state rather than another round trip
+        self._state["gain"] = {"g1": int(greq), "gr": int(greq), "gg2": int(greq), "gb": int(greq)}
         rgain = self.getGain()
         if self.verbose:
             print(rgain)
@@ -334,11 +504,13 @@ class Camera:
         gain = ct.c_int32(gainreq)
         self.openCamera()
         rc = self.dll.CxSetAllGain(self.h, gain)
-        self.closeCamera()
+        self._release()
         if rc == 0:
+            self.invalidate("gain")
             raise RuntimeError(f"unable to set gain {gainreq}")
 
-        # confirm gain setting
+        # gain setting, from the shadow state rather than another round trip
+        self._state["gain"] = dict.fromkeys(("g1", "gr", "gg2", "gb"), int(gainreq))
         rgain = self.getGain()
         if self.verbose:
             print(rgain)
@@ -353,25 +525,44 @@ class Camera:
                 g = ct.c_int32(gamma)
                 self.openCamera()
                 rc = self.dll.CxSetBrightnessContrastGamma(self.h, b, c, g)
-                self.closeCamera()
+                self._release()
                 if rc == 0:
                     raise RuntimeError("CxSetBrightnessContrastGamma: problem setting")
+                self._bcg = (bright, contrast, gamma)
             else:
                 raise ValueError("brightness, contrast, and gamma must be in -127..127")
 
-    def getConversionTable(self):
+    def getConversionTable(self, cached: bool = True):
         """
         gets mapping from 10-bit sensor to 8-bit output that's more typically
         used
+
+        The table is fetched once per brightness/contrast/gamma setting and then
+        served from cache unless cached=False.
         """
-        tbuf = (ct.c_ubyte * 1024)()
+        if cached and self._bcg in self._convtab:
+            return self._convtab[self._bcg]
+
+        tbuf = np.empty(1024, dtype=np.uint8)
         self.openCamera()
-        rc = self.dll.CxGetConvertionTab(self.h, ct.byref(tbuf))
-        self.closeCamera()
+        rc = self.dll.CxGetConvertionTab(self.h, ct.c_void_p(tbuf.ctypes.data))
+        self._release()
         if rc == 0:
             raise RuntimeError("trouble getting 10-8 bit conversion table")
 
-        return np.asarray(tbuf)
+        self._convtab[self._bcg] = tbuf
+        return tbuf
+
+    def to8bit(self, frames, out=None, gamma: float = 1.0, contrast: float = 1.0):
+        """
+        map 10-bit frames (any shape) to 8-bit on the host through the camera's cached
+        conversion table, optionally fused with a display gamma/contrast curve
+        """
+        key = (self._bcg, gamma, contrast)
+        if key not in self._lut:
+            self._lut[key] = make_lut(self.getConversionTable(), 10, gamma, contrast)
+
+        return apply_lut(frames, self._lut[key], out)
 
     # %%
     def startStream(self):  # begin streaming acquisition
@@ -382,13 +573,15 @@ class Camera:
             # leave connection open for streaming
             if rc == 0:
                 raise RuntimeError("CxSetStreamMode: unable to start camera stream")
+            self.streaming = True
 
     def stopStream(self):  # end streaming acquisition
         if True:  # self.getStreamMode(): #this call crashes camera
             print("stopping camera stream")
             self.openCamera()
             rc = self.dll.CxSetStreamMode(self.h, ct.c_byte(0))
-            self.closeCamera()
+            self.streaming = False
+            self._release()
             if rc == 0:
                 raise RuntimeError("CxSetStreamMode: unable to stop camera stream")
 
@@ -399,7 +592,7 @@ class Camera:
         smode = ct.c_ubyte()  # tried ubyte and byte
         self.openCamera()
         rc = self.dll.CxGetStreamMode(self.h, ct.byref(smode))  # pointer didn't help
-        self.closeCamera()
+        self._release()
         if rc == 0:
             raise RuntimeError("CxGetStreamMode: problem checking stream status")
 
@@ -407,35 +600,103 @@ class Camera:
 
     # %%
 
-    def grabFrame(self):  # grab latest frame in stream
+    def _allocRing(self, nring: int):
+        """
+        preallocate the ring of frame buffers grabFrame writes into,
+        with the DLL pointer of each buffer computed once
+        """
+        if nring < 1:
+            raise ValueError("need at least one frame buffer in the ring")
+
+        self._ring = [np.empty((self.ypix, self.xpix), dtype=self.dtype) for _ in range(nring)]
+        self._ringptr = [ct.c_void_p(b.ctypes.data) for b in self._ring]
+        self._iring = 0
+
+    def grabFrame(self, out: np.ndarray | None = None):  # grab latest frame in stream
         """for SMX-M8XC, the "color" camera passes back a grayscale image that was
-        Bayer filtered--you'll need to demosaic!"""
-        Nbuffer = self.xpix * self.ypix
-        imbuffer = (ct.c_ubyte * Nbuffer)()
-        bufferbytes = Nbuffer  # each pixel is 1 byte
+        Bayer filtered--you'll need to demosaic!
+
+        CxGrabVideoFrame writes directly into the buffer returned.
+        Without out=, that is the next buffer of the preallocated ring, which is
+        overwritten nring grabs later--copy any frame you need to keep longer.
+        out= must be a C-contiguous (ypix, xpix) array of self.dtype:
+        uint8 in 8-bit mode, uint16 in 10-bit mode.
+        """
+        if out is None:
+            out = self._ring[self._iring]
+            ptr = self._ringptr[self._iring]
+            self._iring = (self._iring + 1) % len(self._ring)
+        else:
+            if (
+                out.shape != (self.ypix, self.xpix)
+                or out.dtype != self.dtype
+                or not out.flags.c_contiguous
+                or not out.flags.writeable
+            ):
+                raise ValueError(
+                    f"out must be a writeable C-contiguous {self.dtype} array of shape "
+                    f"{(self.ypix, self.xpix)}"
+                )
+            ptr = ct.c_void_p(out.ctypes.data)
 
         if not self.isopen:
             print("* grabframe: attempting to reopen camera connection")
             self.openCamera()
             self.startStream()
 
-        rc = self.dll.CxGrabVideoFrame(self.h, ct.byref(imbuffer), bufferbytes)
+        if self.metrics is None:
+            rc = self.dll.CxGrabVideoFrame(self.h, ptr, out.nbytes)
+        else:
+            with self.metrics.stage("grab"):
+                rc = self.dll.CxGrabVideoFrame(self.h, ptr, out.nbytes)
         if rc == 0:
             logging.error("CxGrabVideoFrame: problem getting frame")
             return
 
-        return np.asarray(imbuffer).reshape((self.ypix, self.xpix), order="C")
+        return out
+
+    def acquire(self, maxsize: int = 8, policy: str = "block", counters: bool = True):
+        """
+        start grabbing on a background thread into a queue of maxsize frames,
+        see pysumix.acquire.Acquisition for the overflow policies.
+        Starts the stream if needed; stop() or leaving the with block stops both.
+        """
+        return Acquisition(self, maxsize, policy, counters).start()
+
+    def frames(
+        self,
+        n: int | None = None,
+        timeout: float | None = None,
+        maxsize: int = 8,
+        policy: str = "block",
+    ) -> Generator[Frame, None, None]:
+        """
+        lazily generate n frames (endless if n is None) as Frame(image, counter, timestamp),
+        grabbed on a background thread. Memory use is fixed by maxsize, whatever n is.
+        Each image is valid until the next frame is requested; copy it to keep it.
+        TimeoutError if no frame arrives within timeout seconds.
+        """
+        with self.acquire(maxsize, policy) as acq:
+            for _ in itertools.count() if n is None else range(n):
+                frame = acq.get(timeout)
+                if frame is None:
+                    return
+                yield frame
 
     # %%
 
-    def get10BitsOutput(self):  # 8 or 10 bits
+    def get10BitsOutput(self, cached: bool = True):  # 8 or 10 bits
+        if cached and "tenbit" in self._state:
+            return self._state["tenbit"]
+
         getbit = ct.c_bool()
         self.openCamera()
         rc = self.dll.CxGet10BitsOutput(self.h, ct.byref(getbit))
-        self.closeCamera()
+        self._release()
         if rc == 0:
             logging.error("CxGet10BitsOutput: Error getting bit mode")
             return
+        self._state["tenbit"] = getbit.value
         return getbit.value
 
     def set10BitsOutput(self, useten):  # False=8 bit, True=10bit
@@ -445,27 +706,34 @@ class Camera:
 
         self.openCamera()
         rc = self.dll.CxSet10BitsOutput(self.h, ct.c_bool(useten))
-        self.closeCamera()
+        self._release()
         if rc == 0:
             logging.error("CxSet10BitsOutput: Error setting bit mode")
+            self.invalidate("tenbit")
+        else:
+            self._state["tenbit"] = bool(useten)
 
     # %%
 
-    def getParams(self):
+    def getParams(self, cached: bool = True):
+        if cached and "params" in self._state:
+            return _TFrameParams.from_buffer_copy(self._state["params"])
+
         params = _TFrameParams()
         self.openCamera()
         rc = self.dll.CxGetScreenParams(self.h, ct.byref(params))
-        self.closeCamera()
+        self._release()
         if rc == 0:
             logging.error("CxGetScreenParams: error getting params")
             return
+        self._state["params"] = _TFrameParams.from_buffer_copy(params)
         return params
 
     def getCameraInfoEx(self):
         det = _TCameraInfoEx()
         self.openCamera()
         rc = self.dll.CxGetCameraInfoEx(self.h, ct.byref(det))
-        self.closeCamera()
+        self._release()
         if rc == 0:
             logging.error("CxGetCameraInfoEx: error getting camera info")
             return
@@ -478,7 +746,7 @@ class Camera:
         det = _TCameraInfo()
         self.openCamera()
         rc = self.dll.CxGetCameraInfo(self.h, ct.byref(det))
-        self.closeCamera()
+        self._release()
         if rc == 0:
             logging.error("CxGetCameraInfo: Error getting camera info")
             return
@@ -491,7 +759,7 @@ class Camera:
         count = ct.c_uint32()
         self.openCamera()
         rc = self.dll.CxGetFrameCounter(self.h, ct.byref(count))  # pointer didn't help
-        self.closeCamera()
+        self._release()
         if rc == 0:
             logging.error("CxGetFrameCounter: problem checking frame number")
             return
@@ -544,16 +812,17 @@ class _TCameraInfoEx(ct.Structure):
 
 class Convert:
     def __init__(self, dll=None):
-        if dll is None:
-            dll = get_dll_path()
-
-        if dll.is_file():
-            print("using", dll)
-            self.dll = ct.windll.LoadLibrary(dll)
-        else:
+        try:
+            self.dll = load_dll(dll)
+        except ImportError:
             self.dll = None
 
-    def BayerToRgb(self, bayerimg, bayerint: int):
+    def BayerToRgb(self, bayerimg, bayerint: int, out: np.ndarray | None = None):
+        """
+        The DLL reads the frame's buffer and writes the (h, w, 3) BGR output
+        directly, into out if given; no per-pixel copies are made.
+        The returned RGB or monochrome image is a view of that output.
+        """
         if bayerimg is None:
             return
 
@@ -564,31 +833,37 @@ class Convert:
             "0: monochrome 1: nearest neighbor 2: bilinear 3:Laplacian 4:Real Monochrome 5:Bayer Average"
         )
 
+        if bayerimg.dtype != np.uint8:
+            raise TypeError(f"CxBayerToRgb takes 8-bit frames, not {bayerimg.dtype}")
+
         """
         note, even if selecting 0: Monochrome, the image returned is I X J X 3
         """
+        bayerimg = np.ascontiguousarray(bayerimg)  # no copy unless the frame is a strided view
         h, w = bayerimg.shape
 
+        if out is None:
+            out = np.empty((h, w, 3), dtype=np.uint8)
+        elif out.shape != (h, w, 3) or out.dtype != np.uint8 or not out.flags.c_contiguous:
+            raise ValueError(f"out must be a C-contiguous uint8 array of shape {(h, w, 3)}")
+
         Width = ct.c_int32(w)
         Height = ct.c_int32(h)
         BayerAlg = ct.c_int32(bayerint)
 
-        Nbuffer = w * h
-        inbuffer = (ct.c_ubyte * Nbuffer)(*bayerimg.ravel(order="C"))
-        outbuffer = (ct.c_ubyte * Nbuffer * 3)()
-
         rc = self.dll.CxBayerToRgb(
-            ct.byref(inbuffer), Width, Height, BayerAlg, ct.byref(outbuffer)
+            ct.c_void_p(bayerimg.ctypes.data),
+            Width,
+            Height,
+            BayerAlg,
+            ct.c_void_p(out.ctypes.data),
         )
         if rc == 0:
             logging.error("could not convert image")
             return
 
         # this is a BGR array if color
-        dimg = np.asarray(outbuffer).reshape((h, w, 3), order="C")
-
         if bayerint in (0, 4):  # monochrome
-            dimg = dimg[..., 0]  # all pages identical
+            return out[..., 0]  # all pages identical
         else:
-            dimg = dimg[..., ::-1]  # reverse colors, BGR -> RGB
-        return dimg
+            return out[..., ::-1]  # reverse colors, BGR -> RGB
@@ -0,0 +1,238 @@
+"""
+background acquisition: CxGrabVideoFrame runs on a dedicated thread feeding a bounded queue.
+
+ctypes releases the GIL for the duration of each DLL call, so the camera keeps being read
+while the consuming thread demosaics, displays or writes frames.
+
+Frames are grabbed into a fixed pool of maxsize + 2 buffers: up to maxsize queued, one being
+filled and one held by the consumer. A frame returned by get() stays valid until the next
+get() call; copy it if you need it longer.
+
+latest() copies the newest grabbed frame without taking it from the queue, for a live
+preview that samples the stream at its own pace.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import Counter, deque
+from typing import NamedTuple
+
+import numpy as np
+
+POLICIES = ("block", "drop-oldest", "drop-newest")
+
+
+class Frame(NamedTuple):
+    image: np.ndarray
+    counter: int | None  # camera CxGetFrameCounter after the grab
+    timestamp: float  # host time.perf_counter() after the grab
+
+
+class Acquisition:
+    """
+    policy decides what happens when the consumer falls behind and the queue is full:
+
+    * block: the grab thread waits for the consumer (camera frames are missed instead)
+    * drop-oldest: the oldest queued frame is discarded
+    * drop-newest: the frame just grabbed is discarded
+    """
+
+    def __init__(self, cam, maxsize: int = 8, policy: str = "block", counters: bool = True):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}")
+        if maxsize < 1:
+            raise ValueError("queue maxsize must be at least 1")
+
+        self.cam = cam
+        self.maxsize = maxsize
+        self.policy = policy
+        self.counters = counters
+
+        self._free = deque(
+            np.empty((cam.ypix, cam.xpix), dtype=cam.dtype) for _ in range(maxsize + 2)
+        )
+        self._queue: deque[Frame] = deque()
+        self._held: np.ndarray | None = None
+        self._latest: Frame | None = None
+        self._pinned: Counter[int] = Counter()  # id() of buffers latest() is copying from
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._running = False
+        self._ownstream = False
+        self.error: Exception | None = None
+
+        self.grabbed = 0
+        self.dropped = 0
+        self.consumed = 0
+        self.first_counter: int | None = None
+        self.last_counter: int | None = None
+
+    def start(self) -> Acquisition:
+        if self._thread is not None:
+            raise RuntimeError("acquisition already started")
+
+        if not self.cam.streaming:
+            self.cam.startStream()
+            self._ownstream = True
+
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="pysumix-acquire", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+        if self._thread is not None:
+            self._thread.join()
+
+        if self._ownstream:
+            self.cam.stopStream()
+            self._ownstream = False
+
+    def __enter__(self) -> Acquisition:
+        if self._thread is None:
+            self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # %% grab thread
+
+    def _run(self):
+        cam = self.cam
+        try:
+            while self._running:
+                with self._cond:
+                    buf = self._free.popleft()
+                    if self._latest is not None and self._latest.image is buf:
+                        self._latest = None  # about to be overwritten
+                    self._cond.wait_for(lambda: not self._pinned[id(buf)])
+
+                if cam.grabFrame(out=buf) is None:
+                    raise RuntimeError("CxGrabVideoFrame: problem getting frame")
+                t = time.perf_counter()
+                counter = cam.getFrameCounter() if self.counters else None
+
+                with self._cond:
+                    self.grabbed += 1
+                    if counter is not None:
+                        if self.first_counter is None:
+                            self.first_counter = counter
+                        self.last_counter = counter
+                    self._latest = Frame(buf, counter, t)
+                    self._put(self._latest)
+                    if cam.metrics is not None:
+                        cam.metrics.frame(counter, t, len(self._queue))
+        except Exception as e:
+            logging.error(f"acquisition thread stopped: {e}")
+            self.error = e
+        finally:
+            with self._cond:
+                self._running = False
+                self._cond.notify_all()
+
+    def _put(self, frame: Frame):
+        """called with the lock held"""
+        if len(self._queue) >= self.maxsize:
+            if self.policy == "block":
+                while len(self._queue) >= self.maxsize and self._running:
+                    self._cond.wait()
+                if not self._running:
+                    self._free.append(frame.image)
+                    return
+            elif self.policy == "drop-oldest":
+                self._free.append(self._queue.popleft().image)
+                self.dropped += 1
+            else:
+                self._free.append(frame.image)
+                self.dropped += 1
+                return
+
+        self._queue.append(frame)
+        self._cond.notify_all()
+
+    # %% consumer
+
+    def get(self, timeout: float | None = None) -> Frame | None:
+        """
+        next queued frame, waiting up to timeout seconds (TimeoutError).
+        Returns None once the acquisition has stopped and the queue is drained;
+        re-raises the grab thread's exception, if that is why it stopped.
+        """
+        with self._cond:
+            if self._held is not None:
+                self._free.append(self._held)
+                self._held = None
+
+            if not self._cond.wait_for(lambda: self._queue or not self._running, timeout):
+                raise TimeoutError(f"no frame within {timeout} seconds")
+
+            if not self._queue:
+                if self.error is not None:
+                    raise self.error
+                return None
+
+            frame = self._queue.popleft()
+            self._held = frame.image
+            self.consumed += 1
+            self._cond.notify_all()
+
+        return frame
+
+    def __iter__(self):
+        while (frame := self.get()) is not None:
+            yield frame
+
+    def latest(self, out: np.ndarray | None = None) -> Frame | None:
+        """
+        copy of the most recently grabbed frame, into out if given, whether or not it was
+        queued, dropped or consumed; None before the first frame. The queue is untouched.
+        The copy is made outside the lock, with the buffer pinned, so neither get() nor the
+        grab thread waits for it, unless the grab thread needs that very buffer.
+        """
+        with self._cond:
+            frame = self._latest
+            if frame is None:
+                return None
+            self._pinned[id(frame.image)] += 1
+
+        try:
+            if out is None:
+                out = np.empty_like(frame.image)
+            out[...] = frame.image
+        finally:
+            with self._cond:
+                self._pinned[id(frame.image)] -= 1
+                self._cond.notify_all()
+
+        return Frame(out, frame.counter, frame.timestamp)
+
+    def stats(self) -> dict[str, int | None]:
+        """
+        grabbed, dropped (queue overflow), consumed and still queued frame totals.
+        With counters, camera_frames is the span of the camera frame counter over the
+        acquisition and missed = camera_frames - grabbed are the frames the camera
+        produced that were never grabbed.
+        """
+        with self._cond:
+            stats: dict[str, int | None] = {
+                "grabbed": self.grabbed,
+                "dropped": self.dropped,
+                "consumed": self.consumed,
+                "queued": len(self._queue),
+                "camera_frames": None,
+                "missed": None,
+            }
+            if self.first_counter is not None and self.last_counter is not None:
+                ncam = self.last_counter - self.first_counter + 1
+                stats["camera_frames"] = ncam
+                stats["missed"] = ncam - self.grabbed
+
+        return stats
@@ -0,0 +1,118 @@
+"""
+asyncio interface to a Camera, for event-loop based control programs.
+
+Every DLL call runs off the event loop. Settings and other control calls go to one
+dedicated control thread, in the order tasks await them, so they never interleave however
+many tasks change settings at once. Frames are grabbed elsewhere: stream() frames by an
+Acquisition grab thread, waited for on a frame thread, and grabFrame() on that frame
+thread, so a slow frame never holds up a settings change:
+
+    async with AsyncCamera(Camera()) as cam:
+        await cam.configure(exposure=5.0)
+        async for frame in cam.stream(100):
+            ...
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import itertools
+from collections.abc import AsyncGenerator
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .acquire import Frame
+
+
+class AsyncCamera:
+    """
+    cam: a pysumix.Camera, used only through this object while the event loop runs.
+    Leaving the async with block stops any stream and closes the device; the object
+    can't be used after that.
+    """
+
+    def __init__(self, cam):
+        self.cam = cam
+        self._control = ThreadPoolExecutor(1, thread_name_prefix="pysumix-control")
+        self._waiter = ThreadPoolExecutor(1, thread_name_prefix="pysumix-stream")
+
+    async def run(self, func, *args, **kwargs):
+        """await func(*args, **kwargs) on the control thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._control, functools.partial(func, *args, **kwargs))
+
+    async def __aenter__(self) -> AsyncCamera:
+        """one device session for the whole block"""
+        await self.run(self.cam.__enter__)
+        return self
+
+    async def __aexit__(self, *exc):
+        try:
+            await self.run(self.cam.__exit__, *exc)
+        finally:
+            self._control.shutdown()
+            self._waiter.shutdown()
+
+    # %% settings
+
+    async def configure(self, **settings):
+        """Camera.configure(**settings)"""
+        await self.run(self.cam.configure, **settings)
+
+    async def setExposure(self, expreq: float) -> None:
+        await self.run(self.cam.setExposure, expreq)
+
+    async def getExposure(self, cached: bool = True) -> float:
+        return await self.run(self.cam.getExposure, cached)
+
+    async def setGain(self, greq: int) -> dict[str, int]:
+        return await self.run(self.cam.setGain, greq)
+
+    async def setAllGain(self, gainreq: int) -> dict[str, int]:
+        return await self.run(self.cam.setAllGain, gainreq)
+
+    async def getGain(self, cached: bool = True) -> dict[str, int]:
+        return await self.run(self.cam.getGain, cached)
+
+    async def setFrequency(self, freqbyte: int):
+        await self.run(self.cam.setFrequency, freqbyte)
+
+    # %% frames
+
+    async def startStream(self):
+        await self.run(self.cam.startStream)
+
+    async def stopStream(self):
+        await self.run(self.cam.stopStream)
+
+    async def grabFrame(self, out: np.ndarray | None = None) -> np.ndarray | None:
+        """
+        single frame from a stream started with startStream(), as Camera.grabFrame.
+        Grabbed on the frame thread, so settings changes don't wait for it.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._waiter, self.cam.grabFrame, out)
+
+    async def stream(
+        self,
+        n: int | None = None,
+        timeout: float | None = None,
+        maxsize: int = 8,
+        policy: str = "block",
+    ) -> AsyncGenerator[Frame, None]:
+        """
+        asynchronously generate n frames (endless if None), as Camera.frames():
+        grabbed on a background thread, each valid until the next one is requested.
+        """
+        loop = asyncio.get_running_loop()
+        acq = await self.run(self.cam.acquire, maxsize, policy)
+        try:
+            for _ in itertools.count() if n is None else range(n):
+                frame = await loop.run_in_executor(self._waiter, acq.get, timeout)
+                if frame is None:
+                    return
+                yield frame
+        finally:
+            await self.run(acq.stop)
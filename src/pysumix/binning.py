@@ -0,0 +1,109 @@
+"""
+host-side Bayer binning: sum n x n same-color sites of raw GRBG frames.
+
+The camera's decimation (Camera(decim=...)) skips pixels; binning adds them, so the
+smaller frame keeps all the collected light, with n times the shot-noise limited
+signal-to-noise ratio. Sums go into an unsigned dtype wide enough to hold them
+(uint8 -> uint16, uint16 -> uint32), accumulated with one strided in-place add per summed
+site, with no temporary arrays:
+
+    small = binning(frame, 2)  # still a GRBG mosaic, half the width and height
+    rgb = binning(frame, 2, "rgb")  # one RGB pixel per 4x4 pixel superpixel
+
+Rows and columns past a whole number of 2n x 2n superpixels are cropped.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+
+import numpy as np
+
+MODES = {"bayer": 1, "rgb": 2, "gray": 4}  # sites summed per output value, times n*n
+
+
+def bindtype(dtype, n: int, mode: str = "bayer") -> np.dtype:
+    """smallest unsigned dtype that holds the binned sums of full-scale dtype frames"""
+    return np.min_scalar_type(int(np.iinfo(dtype).max) * MODES[mode] * n * n)
+
+
+def binned_shape(shape: tuple[int, ...], n: int, mode: str = "bayer") -> tuple[int, ...]:
+    """output shape of binning frames of shape (..., H, W)"""
+    h = shape[-2] // (2 * n)
+    w = shape[-1] // (2 * n)
+    if mode == "bayer":
+        return shape[:-2] + (2 * h, 2 * w)
+    if mode == "rgb":
+        return shape[:-2] + (h, w, 3)
+    return shape[:-2] + (h, w)
+
+
+def binning(frames, n: int = 2, mode: str = "bayer", out: np.ndarray | None = None):
+    """
+    frames: raw GRBG frame (H, W) or stack (..., H, W), uint8 or uint16
+    n: sites of each color summed along each axis
+    mode:
+      bayer: GRBG mosaic, each site the sum of n x n sites of its color
+      rgb: (..., H/2n, W/2n, 3), red and blue n x n sums, green the rounded mean of
+        the two green n x n sums
+      gray: (..., H/2n, W/2n), sum of all 4n^2 pixels of each superpixel, for luminance
+    out: preallocated output of binned_shape(), any unsigned dtype at least bindtype()
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {tuple(MODES)}")
+    if n < 1:
+        raise ValueError("n must be at least 1")
+
+    frames = np.asarray(frames)
+    if frames.ndim < 2 or frames.dtype.kind != "u":
+        raise TypeError(f"binning needs unsigned integer frames (..., H, W), not {frames.dtype}")
+
+    shape = binned_shape(frames.shape, n, mode)
+    if 0 in shape[-3:]:
+        raise ValueError(f"frame {frames.shape[-2:]} smaller than one {2 * n}x{2 * n} superpixel")
+
+    dtype = bindtype(frames.dtype, n, mode)
+    if out is None:
+        out = np.empty(shape, dtype=dtype)
+    elif out.shape != shape or not np.can_cast(dtype, out.dtype):
+        raise ValueError(f"out must be shape {shape} and hold {dtype}")
+
+    h = frames.shape[-2] // (2 * n)
+    w = frames.shape[-1] // (2 * n)
+
+    if mode == "bayer":
+        for i in (0, 1):
+            for j in (0, 1):
+                _sum(_sites(frames, i, j, n, h, w), out[..., i::2, j::2])
+    elif mode == "rgb":
+        _sum(_sites(frames, 0, 1, n, h, w), out[..., 0])
+        green = out[..., 1]
+        _sum(_sites(frames, 0, 0, n, h, w), green)
+        _sum(_sites(frames, 1, 1, n, h, w), green, first=False)
+        green += 1
+        green >>= 1
+        _sum(_sites(frames, 1, 0, n, h, w), out[..., 2])
+    else:
+        for i in (0, 1):
+            for j in (0, 1):
+                _sum(_sites(frames, i, j, n, h, w), out, first=(i, j) == (0, 0))
+
+    return out
+
+
+def _sites(frames: np.ndarray, i: int, j: int, n: int, h: int, w: int) -> Iterator[np.ndarray]:
+    """the n*n strided (..., h, w) views of Bayer site (i, j) that make up each binned site"""
+    s = 2 * n
+    for u in range(n):
+        for v in range(n):
+            yield frames[..., 2 * u + i :: s, 2 * v + j :: s][..., :h, :w]
+
+
+def _sum(views: Iterator[np.ndarray], dst: np.ndarray, first: bool = True):
+    """add views into dst in place, overwriting it first if first"""
+    for x in views:
+        if first:
+            dst[...] = x
+            first = False
+        else:
+            np.add(dst, x, out=dst)
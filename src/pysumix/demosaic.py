@@ -1,5 +1,5 @@
 """
-demosaic bayer filter of type 'grbg' using nearest neighbor interpolation
+demosaic bayer filter of type 'grbg' using nearest neighbor or bilinear interpolation
 
 input:
 assumes uint8 or uint16 raw bayer filtered grbg input
@@ -13,73 +13,273 @@ Note:  If you're on Windows, be sure your PATH environment variable includes you
     E.g. Python installed to C:/Miniconda3, you should have C:/Miniconda3/DLLs on your Windows PATH.
 """
 
+from concurrent.futures import ThreadPoolExecutor
 import logging
+import os
+
 import numpy as np
 from scipy.ndimage import zoom
 
 from . import Convert
 
-from .rgb2gray import rgb2gray
+from .rgb2gray import luma
 
 
-def demosaic(img, method: str = "", alg: int = 1, color: bool = True):
+def demosaic(
+    img,
+    method: str = "",
+    alg: int = 1,
+    color: bool = True,
+    out=None,
+    metrics=None,
+    workers: int | None = 1,
+):
+    """
+    img: 2-D mosaiced frame or 3-D (N, H, W) stack of frames.
+    A stack is demosaiced in one vectorized pass, into out if given
+    (shape img.shape + (3,) for color, img.shape for gray).
+    metrics: optional pysumix.metrics.Metrics, records the call as stage "demosaic"
+    workers: threads to split a stack across, None for one per CPU; see grbg2rgb
+    """
+    if metrics is not None:
+        with metrics.stage("demosaic"):
+            return demosaic(img, method, alg, color, out, workers=workers)
 
     ndim = img.ndim
     if ndim == 2:
         pass  # normal case
-    elif ndim == 3 and img.shape[-1] != 3:  # normal case, iterate
-        logging.info(f"iterate over {img.shape[0]} frames")
-        if color:
-            dem = np.empty(img.shape + (3,), dtype=img.dtype)
-        else:
-            dem = np.empty(img.shape, dtype=img.dtype)
-        for i, f in enumerate(img):
-            dem[i, ...] = demosaic(f, method, alg, color)
-        return dem
+    elif ndim == 3 and img.shape[-1] != 3:  # normal case, stack of frames
+        if str(method).lower() == "sumix":
+            logging.info(f"iterate over {img.shape[0]} frames")
+            if out is None:
+                out = np.empty(img.shape + (3,) if color else img.shape, dtype=img.dtype)
+            # one DLL load and one BGR scratch frame for the whole stack
+            conv = Convert()
+            bgr = np.empty(img.shape[1:] + (3,), dtype=np.uint8)
+            for i, f in enumerate(img):
+                out[i, ...] = conv.BayerToRgb(f, alg, out=bgr)
+            return out
     else:
         raise ValueError(f"unsure what you want with shape {img.shape}")
 
     if str(method).lower() == "sumix":
         return Convert().BayerToRgb(img, alg)
     else:
-        return grbg2rgb(img, alg, color)
+        return grbg2rgb(img, alg, color, out, workers)
 
 
-def grbg2rgb(img, alg: int = 1, color: bool = True):
+def grbg2rgb(img, alg: int = 1, color: bool = True, out=None, workers: int | None = 1):
     """GRBG means the upper left corner of the image has four pixels arranged like
     green  red
     blue    green
+
+    img is a 2-D frame, or a stack of frames on leading axes (..., H, W)
+
+    alg:
+    1: nearest neighbor, each 2x2 Bayer cell becomes one RGB value
+    2: bilinear, missing colors interpolated from neighbors at each pixel site
+    3, 4: quadratic, cubic spline zoom of the half-resolution RGB image
+
+    color=False computes BT.601 luma straight from the Bayer sites in integer fixed point,
+    without building the RGB image.
+
+    workers: with more than one, a stack is split into chunks of frames demosaiced on a
+    thread pool, each straight into its slice of out. img may then also be an h5py
+    Dataset, which is read chunk by chunk.
     """
-    if img.ndim != 2:
-        raise NotImplementedError(f"for now, only 2-D Numpy ndarray is accepted {img.shape}")
+    if img.ndim < 2:
+        raise NotImplementedError(f"need a 2-D frame or stack of frames {img.shape}")
 
-    if img.shape[0] % 2 or img.shape[1] % 2:
+    if img.shape[-2] % 2 or img.shape[-1] % 2:
         raise TypeError(f"requires even-numbered number of pixels on both axes {img.shape}")
 
     if img.dtype not in (np.uint8, np.uint16):
         raise TypeError(f"demosaic is currently for uint8 and uint16 input ONLY {img.shape}")
 
-    # upcast g1,g2 to avoid overflow from 8-bit or 16-bit input
-    g1 = img[0::2, 0::2].astype(np.uint32)
-    g2 = img[1::2, 1::2].astype(np.uint32)
-    r = img[0::2, 1::2]
-    b = img[1::2, 0::2]
+    if not 1 <= alg <= 4:
+        logging.warning(f"unknown method {alg}  falling back to nearest neighbor alg=1")
+        alg = 1
+
+    if workers != 1 and img.ndim > 2 and img.shape[0] > 1:
+        return _parallel(img, alg, color, out, workers)
+
+    img = np.asarray(img)
 
-    g = np.round(((g1 + g2) / 2)).astype(img.dtype)
+    if not color:
+        return _gray(img, alg, out)
 
-    rgb = np.dstack((r, g, b))
-    # this is the way matplotlib likes it for imshow (RGB in axis=2)
+    # this is the way matplotlib likes it for imshow (RGB in last axis)
+    if out is None:
+        out = np.empty(img.shape + (3,), dtype=img.dtype)
 
-    if 1 <= alg <= 4:
-        order = alg - 1
+    if alg == 1:
+        for i in np.ndindex(img.shape[:-2]):
+            _nearest(img[i], out[i])
+    elif alg == 2:
+        for k, i, j, planes in _bilinear_sites(img):
+            for c, plane in enumerate(planes):
+                out[k][i::2, j::2, c] = plane
     else:
-        logging.warning(f"unknown method {alg}  falling back to nearest neighbor alg=1")
-        order = 0
+        g = _green(img[..., 0::2, 0::2], img[..., 1::2, 1::2])
+        rgb = np.stack((img[..., 0::2, 1::2], g, img[..., 1::2, 0::2]), axis=-1)
+        # zoom each frame straight into the output: zooming the whole stack at once would also
+        # interpolate along the frame axis, which is several times slower
+        for i in np.ndindex(img.shape[:-2]):
+            zoom(rgb[i], zoom=(2, 2, 1), order=alg - 1, output=out[i])  # type: ignore
 
-    demos = zoom(rgb, zoom=(2, 2, 1), order=order)  # type: ignore
-    # 0:nearest neighbor
+    return out
 
-    if not color:
-        demos = rgb2gray(demos)
 
-    return demos
+def _gray(img, alg: int, out):
+    """
+    luma of each pixel from the same color estimates the RGB algorithms use, combined per
+    Bayer site as they are made, so no 3-channel image is built
+    """
+    if out is None:
+        out = np.empty(img.shape, dtype=img.dtype)
+
+    h, w = img.shape[-2:]
+    # fixed-point scratch, reused for every frame
+    scratch = np.empty((2, h // 2, w // 2), dtype=np.uint32)
+
+    if alg == 1:
+        half = np.empty((h // 2, w // 2), dtype=img.dtype)
+        for k in np.ndindex(img.shape[:-2]):
+            frame = img[k]
+            g = _green(frame[0::2, 0::2], frame[1::2, 1::2])
+            luma(frame[0::2, 1::2], g, frame[1::2, 0::2], half, scratch)
+            _replicate(half, out[k])
+    elif alg == 2:
+        for k, i, j, (r, g, b) in _bilinear_sites(img):
+            luma(r, g, b, out[k][i::2, j::2], scratch)
+    else:
+        # the splines over- and undershoot, clipped per color, so zoom one RGB frame at a time
+        rgb = np.empty((h, w, 3), dtype=img.dtype)
+        scratch = np.empty((2, h, w), dtype=np.uint32)
+        for k in np.ndindex(img.shape[:-2]):
+            grbg2rgb(img[k], alg, out=rgb)
+            luma(rgb[..., 0], rgb[..., 1], rgb[..., 2], out[k], scratch)
+
+    return out
+
+
+def _parallel(img, alg: int, color: bool, out, workers: int | None):
+    """
+    demosaic a stack on a thread pool. The NumPy kernels release the GIL, so threads share
+    the input and output arrays without the copies a process pool would need.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if out is None:
+        out = np.empty(img.shape + (3,) if color else img.shape, dtype=img.dtype)
+
+    n = img.shape[0]
+    # a few chunks per worker, so a slow chunk doesn't leave the other threads idle
+    step = -(-n // (4 * workers))
+
+    def work(i: int):
+        grbg2rgb(img[i : i + step], alg, color, out[i : i + step])
+
+    with ThreadPoolExecutor(workers) as pool:
+        # list() re-raises any worker's exception here
+        list(pool.map(work, range(0, n, step)))
+
+    return out
+
+
+def _green(g1, g2):
+    """
+    round((g1 + g2) / 2) with NumPy's round-half-to-even, in the input dtype
+    without upcasting to avoid overflow
+    """
+    g = (g1 >> 1) + (g2 >> 1) + (g1 & g2 & 1)  # floor of the mean
+    g += (g1 ^ g2) & g & 1  # exact halves round to the even neighbor
+    return g
+
+
+def _nearest(img, out):
+    """replicate each 2x2 Bayer cell's RGB over the cell of a 2-D frame"""
+    h, w = img.shape
+
+    rgb = np.stack(
+        (img[0::2, 1::2], _green(img[0::2, 0::2], img[1::2, 1::2]), img[1::2, 0::2]), axis=-1
+    )
+    _replicate(rgb, out)
+
+
+def _replicate(cell, out):
+    """copy per-cell values (H/2, W/2, ...) over each 2x2 cell of out (H, W, ...)"""
+    h, w = out.shape[:2]
+
+    if out.flags.c_contiguous:
+        # (H/2, 2, W/2, 2, ...) view: fill the top row of each cell by broadcasting, then copy it
+        cells = out.reshape((h // 2, 2, w // 2, 2) + out.shape[2:])
+        cells[:, 0] = cell[:, :, None]
+        cells[:, 1] = cells[:, 0]
+    else:
+        for i in (0, 1):
+            for j in (0, 1):
+                out[i::2, j::2] = cell
+
+
+def _bilinear_sites(img):
+    """
+    bilinear GRBG demosaic at the true pixel sites: yields (k, i, j, (r, g, b)), the colors
+    at Bayer site (i, j) of every cell of frame k, raw or interpolated. The interpolated
+    planes are scratch arrays, overwritten for the next site.
+    Edges are mirrored, which keeps the Bayer phase of the border pixels.
+    Stacks are processed frame by frame, which keeps the working set in cache
+    and reuses the scratch arrays.
+    """
+    h, w = img.shape[-2:]
+    wide = np.uint16 if img.dtype == np.uint8 else np.uint32
+
+    # mirror-padded frame in a dtype wide enough to sum four neighbors
+    p = np.empty((h + 2, w + 2), dtype=wide)
+    # each site has two interpolated colors
+    accs = np.empty((2, h // 2, w // 2), dtype=wide)
+
+    def site(i: int, j: int, di: int, dj: int):
+        """neighbor (di, dj) of every Bayer site (i, j)"""
+        i0 = 1 + i + di
+        j0 = 1 + j + dj
+        return p[i0 : i0 + h : 2, j0 : j0 + w : 2]
+
+    def mean(i: int, j: int, offsets, acc):
+        a = np.add(site(i, j, *offsets[0]), site(i, j, *offsets[1]), out=acc)
+        for o in offsets[2:]:
+            a += site(i, j, *o)
+        # rounded division by 2 or 4
+        a += len(offsets) // 2
+        a >>= len(offsets) // 2
+        return a
+
+    horiz = ((0, -1), (0, 1))
+    vert = ((-1, 0), (1, 0))
+    cross = horiz + vert
+    diag = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+
+    # (row, column) of each site, then the neighbors giving each color there
+    sites = (
+        (0, 0, horiz, None, vert),  # green on red rows
+        (0, 1, None, cross, diag),  # red
+        (1, 0, diag, cross, None),  # blue
+        (1, 1, vert, None, horiz),  # green on blue rows
+    )
+
+    for k in np.ndindex(img.shape[:-2]):
+        frame = img[k]
+
+        p[1:-1, 1:-1] = frame
+        p[0, :] = p[2, :]
+        p[-1, :] = p[-3, :]
+        p[:, 0] = p[:, 2]
+        p[:, -1] = p[:, -3]
+
+        for i, j, rn, gn, bn in sites:
+            scratch = iter(accs)
+            planes = tuple(
+                frame[i::2, j::2] if nbr is None else mean(i, j, nbr, next(scratch))
+                for nbr in (rn, gn, bn)
+            )
+            yield k, i, j, planes
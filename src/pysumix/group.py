@@ -0,0 +1,168 @@
+"""
+several cameras acquiring concurrently, with their frames matched into synchronized tuples.
+
+Each camera grabs on its own Acquisition thread; ctypes releases the GIL during
+CxGrabVideoFrame, so cameras on separate USB buses are read in parallel rather than in turn.
+The free-running cameras share no trigger, so frames are matched by host timestamp:
+
+    cams = [Camera(dll=..., cid=i) for i in (0, 1)]
+    with CameraGroup(cams) as group:
+        group.configure(exposure=5.0)
+        for frames in group.frames(100):
+            for cam, (image, counter, timestamp) in zip(group.cameras, frames):
+                ...
+"""
+
+from __future__ import annotations
+
+import contextlib
+import itertools
+from collections.abc import Generator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .acquire import Frame
+
+MIN_TOLERANCE = 0.001  # [s] floor of the default tolerance, about the host timestamp jitter
+NSAMPLE = 8  # frames per camera read to estimate the frame period
+
+
+class _Ended(Exception):
+    """a camera's acquisition stopped"""
+
+
+class CameraGroup:
+    """
+    cameras: pysumix.Camera objects, typically each with its own cid
+    """
+
+    def __init__(self, cameras: Sequence):
+        if not cameras:
+            raise ValueError("a camera group needs at least one camera")
+
+        self.cameras = list(cameras)
+        self.acquisitions: list = []
+        self._stack: contextlib.ExitStack | None = None
+
+        self.matched = 0
+        self.discarded = [0] * len(self.cameras)  # frames with no partner within tolerance
+        self.skew = 0.0  # largest timestamp spread of a matched tuple [s]
+        self.tolerance: float | None = None  # [s] used by the last frames()
+
+    def __enter__(self) -> CameraGroup:
+        """one device session per camera for the whole block"""
+        with contextlib.ExitStack() as stack:
+            for cam in self.cameras:
+                stack.enter_context(cam)
+            # keep the sessions only once every camera is open
+            self._stack = stack.pop_all()
+        return self
+
+    def __exit__(self, *exc):
+        if self._stack is not None:
+            self._stack.close()
+            self._stack = None
+
+    def _each(self, func, undo=None) -> list:
+        """
+        func(camera) on every camera at once, results in camera order.
+        If any call raises, undo(result) is called on the results of those that succeeded
+        before the first error is raised.
+        """
+        with ThreadPoolExecutor(len(self.cameras)) as pool:
+            futures = [pool.submit(func, cam) for cam in self.cameras]
+
+        failed = [f for f in futures if f.exception() is not None]
+        if failed:
+            if undo is not None:
+                for f in futures:
+                    if f.exception() is None:
+                        undo(f.result())
+            failed[0].result()  # raises its error
+        return [f.result() for f in futures]
+
+    def configure(self, **settings):
+        """Camera.configure(**settings) on all cameras concurrently"""
+        self._each(lambda cam: cam.configure(**settings))
+
+    def frames(
+        self,
+        n: int | None = None,
+        tolerance: float | None = None,
+        timeout: float | None = None,
+        maxsize: int = 8,
+        policy: str = "block",
+    ) -> Generator[tuple[Frame, ...], None, None]:
+        """
+        generate n (endless if None) tuples holding one Frame per camera, in camera order,
+        whose host timestamps are within tolerance seconds of each other.
+        A frame too old to have a partner in every other camera's stream is discarded.
+        tolerance: by default half the longest camera frame period, the median interval of
+            the first NSAMPLE frames of each camera, and at least MIN_TOLERANCE.
+            The tolerance used is kept as self.tolerance.
+        Frames are valid until the next tuple is requested, as for Camera.frames().
+        """
+        with contextlib.ExitStack() as stack:
+            self.acquisitions = self._each(
+                lambda cam: cam.acquire(maxsize, policy), undo=lambda acq: acq.stop()
+            )
+            for acq in self.acquisitions:
+                stack.enter_context(acq)
+
+            def get(i: int) -> Frame:
+                frame = self.acquisitions[i].get(timeout)
+                if frame is None:
+                    raise _Ended
+                return frame
+
+            try:
+                if tolerance is None:
+                    periods = [
+                        _period([get(i) for _ in range(NSAMPLE)]) for i in range(len(self.cameras))
+                    ]
+                    tolerance = max(0.5 * max(periods), MIN_TOLERANCE)
+                self.tolerance = tolerance
+
+                for _ in itertools.count() if n is None else range(n):
+                    heads = [get(i) for i in range(len(self.cameras))]
+                    while True:
+                        newest = max(f.timestamp for f in heads)
+                        late = [i for i, f in enumerate(heads) if newest - f.timestamp > tolerance]
+                        if not late:
+                            break
+                        for i in late:
+                            self.discarded[i] += 1
+                            heads[i] = get(i)
+
+                    self.matched += 1
+                    self.skew = max(self.skew, newest - min(f.timestamp for f in heads))
+                    yield tuple(heads)
+            except _Ended:
+                return
+
+    def stats(self) -> dict:
+        """matched tuples, largest skew [s], and per-camera discards and acquisition stats"""
+        return {
+            "matched": self.matched,
+            "skew": self.skew,
+            "cameras": [
+                dict(acq.stats(), discarded=d) for acq, d in zip(self.acquisitions, self.discarded)
+            ],
+        }
+
+
+def _period(frames: list[Frame]) -> float:
+    """
+    median frame period [s] of consecutive frames.
+    Each interval is divided by the frame counter step when counters are known, so dropped
+    frames don't lengthen it, and the median ignores the near-zero intervals of frames the
+    camera had already buffered, which are grabbed back to back.
+    """
+    dt = []
+    for a, b in zip(frames, frames[1:]):
+        step = 1
+        if a.counter is not None and b.counter is not None and b.counter > a.counter:
+            step = b.counter - a.counter
+        dt.append((b.timestamp - a.timestamp) / step)
+    return float(np.median(dt))
@@ -0,0 +1,65 @@
+"""
+lookup tables mapping raw 10-bit frames to 8-bit for display and preview.
+
+The camera's own 10->8 bit mapping (Camera.getConversionTable) or a linear one
+can be combined with a gamma / contrast curve into a single table, which is then
+applied to a frame or stack with np.take, with no camera round trip.
+"""
+
+import numpy as np
+
+# pixels mapped per np.take call: take copies its indices to intp (8 bytes per pixel)
+# first, so mapping a block of rows at a time keeps that copy small
+CHUNK = 1 << 16
+
+
+def make_lut(
+    table: np.ndarray | None = None, bits: int = 10, gamma: float = 1.0, contrast: float = 1.0
+) -> np.ndarray:
+    """
+    uint8 table with 2**bits entries.
+
+    table: raw -> 8-bit mapping to start from, such as Camera.getConversionTable();
+        by default a linear mapping keeping the top 8 bits.
+    contrast: stretch about mid-gray, > 1 increases contrast
+    gamma: display gamma applied after contrast, > 1 brightens midtones
+    """
+    if table is None:
+        table = (np.arange(2**bits) >> (bits - 8)).astype(np.uint8)
+    elif table.size != 2**bits:
+        raise ValueError(f"expected a {2**bits} entry table for {bits}-bit data, got {table.size}")
+
+    if gamma == 1.0 and contrast == 1.0:
+        return np.asarray(table, dtype=np.uint8)
+    if gamma <= 0 or contrast < 0:
+        raise ValueError("gamma must be positive and contrast non-negative")
+
+    # 256 entry display curve, composed with the input table
+    v = np.clip((np.arange(256) / 255 - 0.5) * contrast + 0.5, 0, 1)
+    curve = np.around(255 * v ** (1 / gamma)).astype(np.uint8)
+
+    return curve[table]
+
+
+def apply_lut(frames: np.ndarray, table: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+    """
+    map raw frames of any shape through table, into out if given.
+    Values past the end of the table (e.g. stray high bits) clip to its last entry.
+    Mapped CHUNK pixels at a time, so besides out only a small index copy is allocated.
+    """
+    if frames.dtype.kind != "u":
+        raise TypeError(f"lookup needs unsigned integer frames, not {frames.dtype}")
+
+    if out is None:
+        out = np.empty(frames.shape, dtype=table.dtype)
+    elif out.shape != frames.shape:
+        raise ValueError(f"out must be shape {frames.shape}")
+
+    src = np.atleast_2d(frames)
+    dst = np.atleast_2d(out)
+    nrow = max(CHUNK // max(src.shape[-1], 1), 1)
+    for k in np.ndindex(src.shape[:-2]):
+        for i in range(0, src.shape[-2], nrow):
+            np.take(table, src[k][i : i + nrow], out=dst[k][i : i + nrow], mode="clip")
+
+    return out
@@ -0,0 +1,113 @@
+"""
+opt-in timing instrumentation for the acquisition pipeline.
+
+A Metrics object attached to a Camera (Camera(metrics=...) or cam.metrics = ...) records
+the duration of each CxGrabVideoFrame call, and through Camera.acquire/frames each frame's
+host timestamp, camera frame counter gap and queue depth. demosaic(..., metrics=) and any
+other stage wrapped in ``with metrics.stage("name"):`` add their durations, so a slow
+capture rate can be traced to grabbing, demosaicing, preview or disk writes.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import csv
+import json
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+
+class Event(NamedTuple):
+    time: float  # time.perf_counter() at the end of the stage
+    stage: str
+    duration: float  # seconds, 0 for frame events
+    counter: int | None = None  # camera frame counter, frame events only
+    gap: int | None = None  # camera frames skipped since the previous frame
+    queued: int | None = None  # acquisition queue depth after this frame
+
+
+class Metrics:
+    def __init__(self) -> None:
+        self.events: list[Event] = []
+        self._last_counter: int | None = None
+
+    def add(self, stage: str, duration: float):
+        """record a stage duration in seconds"""
+        # list.append is atomic, so the grab thread and consumer can both record
+        self.events.append(Event(time.perf_counter(), stage, duration))
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """time the enclosed block as one run of stage name"""
+        tic = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - tic)
+
+    def frame(self, counter: int | None, timestamp: float, queued: int | None = None):
+        """record a grabbed frame"""
+        gap = None
+        if counter is not None and self._last_counter is not None:
+            gap = counter - self._last_counter - 1
+        if counter is not None:
+            self._last_counter = counter
+
+        self.events.append(Event(timestamp, "frame", 0.0, counter, gap, queued))
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """
+        per stage: count, mean, p50, p99 and max duration [ms];
+        for frames: count, rate [frames/s], total and largest counter gap, largest queue depth
+        """
+        out: dict[str, dict[str, float]] = {}
+
+        stages = sorted({e.stage for e in self.events} - {"frame"})
+        for name in stages:
+            d = 1e3 * np.array([e.duration for e in self.events if e.stage == name])
+            out[name] = {
+                "count": d.size,
+                "mean_ms": d.mean(),
+                "p50_ms": np.percentile(d, 50),
+                "p99_ms": np.percentile(d, 99),
+                "max_ms": d.max(),
+            }
+
+        frames = [e for e in self.events if e.stage == "frame"]
+        if frames:
+            gaps = [e.gap for e in frames if e.gap is not None]
+            queued = [e.queued for e in frames if e.queued is not None]
+            span = frames[-1].time - frames[0].time
+            out["frame"] = {
+                "count": len(frames),
+                "rate": (len(frames) - 1) / span if span > 0 else float("nan"),
+                "missed": sum(gaps),
+                "max_gap": max(gaps, default=0),
+                "max_queued": max(queued, default=0),
+            }
+
+        return out
+
+    def to_csv(self, fn: Path | str):
+        with Path(fn).expanduser().open("w", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(Event._fields)
+            w.writerows(self.events)
+
+    def to_json(self, fn: Path | str):
+        Path(fn).expanduser().write_text(
+            json.dumps(
+                {"summary": self.summary(), "events": [e._asdict() for e in self.events]},
+                indent=1,
+            )
+        )
+
+    def save(self, fn: Path | str):
+        """trace to .csv or .json by file extension"""
+        if Path(fn).suffix.lower() == ".json":
+            self.to_json(fn)
+        else:
+            self.to_csv(fn)
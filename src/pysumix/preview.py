@@ -0,0 +1,163 @@
+"""
+live preview that never holds up acquisition.
+
+A Preview samples the newest grabbed frame from an Acquisition (Acquisition.latest) at no
+more than rate frames/s, so it never takes frames from the consumer's queue, and prepares a
+small 8-bit display image on its own thread: every step-th pixel, with the cheapest
+nearest-neighbor demosaic (one R, G, B per sampled Bayer cell) and 10-bit frames through the
+camera's conversion table. The GUI thread only draws finished images:
+
+    with cam.acquire() as acq, Preview(acq) as pv:
+        hi = imshow(pv.blank())
+        for frame in acq:
+            rec.append(*frame)
+            pv.show(hi)
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+import numpy as np
+
+from .lut import make_lut, apply_lut
+
+
+class Preview:
+    """
+    acq: a started pysumix.acquire.Acquisition
+    rate: maximum display frames per second
+    step: display decimation; even for color, so each sample is a whole Bayer cell
+    color: nearest-neighbor RGB from the GRBG sites, else the raw mosaic as gray
+    lut: 10->8 bit table for uint16 frames, by default the camera's conversion table
+    """
+
+    def __init__(
+        self,
+        acq,
+        rate: float = 10.0,
+        step: int = 2,
+        color: bool = True,
+        lut: np.ndarray | None = None,
+    ):
+        if rate <= 0:
+            raise ValueError("preview rate must be positive")
+        if step < 1 or (color and step % 2):
+            raise ValueError("step must be a positive integer, and even for color")
+
+        cam = acq.cam
+        self.acq = acq
+        self.period = 1 / rate
+        self.step = step
+        self.color = color
+
+        if lut is None and cam.dtype == np.uint16:
+            # fetched here on the caller's thread, not from the preview thread
+            lut = make_lut(cam.getConversionTable())
+        self.lut = lut
+
+        # color samples whole Bayer cells: an odd last row or column has no partner sites
+        self._ny = cam.ypix - cam.ypix % 2 if color else cam.ypix
+        self._nx = cam.xpix - cam.xpix % 2 if color else cam.xpix
+        h = -(-self._ny // step)
+        w = -(-self._nx // step)
+        self.shape = (h, w, 3) if color else (h, w)
+
+        self._raw = np.empty((cam.ypix, cam.xpix), dtype=cam.dtype)
+        self._work = np.empty(self.shape, dtype=cam.dtype)
+        self._ready = np.empty(self.shape, dtype=np.uint8)
+        self._new = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+        self.prepared = 0  # display images made
+        self.shown = 0  # display images handed to the GUI
+        self.last_counter: int | None = None
+
+    def start(self) -> Preview:
+        if self._thread is not None:
+            raise RuntimeError("preview already started")
+
+        self._thread = threading.Thread(target=self._run, name="pysumix-preview", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> Preview:
+        if self._thread is None:
+            self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # %% preview thread
+
+    def _run(self):
+        last = None
+        tick = time.perf_counter()
+        while not self._stop.wait(max(0.0, tick - time.perf_counter())):
+            tick += self.period
+            frame = self.acq.latest(self._raw)
+            if frame is None or frame.timestamp == last:
+                continue  # nothing new since the last display image
+            last = frame.timestamp
+
+            img = self.prepare(frame.image)
+            with self._lock:
+                self._ready[...] = img
+                self._new = True
+                self.prepared += 1
+                self.last_counter = frame.counter
+
+    def prepare(self, raw: np.ndarray) -> np.ndarray:
+        """8-bit display image of a raw frame"""
+        s = self.step
+        work = self._work
+        raw = raw[: self._ny, : self._nx]
+        if self.color:
+            # GRBG: green top-left, red top-right, blue bottom-left of each sampled cell
+            work[..., 0] = raw[0::s, 1::s]
+            work[..., 1] = raw[0::s, 0::s]
+            work[..., 2] = raw[1::s, 0::s]
+        else:
+            work[...] = raw[::s, ::s]
+
+        if self.lut is not None:
+            return apply_lut(work, self.lut)
+        return work
+
+    # %% GUI thread
+
+    def blank(self) -> np.ndarray:
+        """black image of the display shape, to create the GUI image with"""
+        return np.zeros(self.shape, dtype=np.uint8)
+
+    def poll(self) -> np.ndarray | None:
+        """the newest display image if there is one not yet polled, else None; never waits"""
+        with self._lock:
+            if not self._new:
+                return None
+            self._new = False
+            self.shown += 1
+            return self._ready.copy()
+
+    def show(self, image) -> bool:
+        """
+        update a matplotlib AxesImage with the newest display image, if any, and let the GUI
+        process events; cheap to call for every frame. Returns whether the image changed.
+        """
+        img = self.poll()
+        if img is None:
+            return False
+
+        image.set_data(img)
+        image.figure.canvas.draw_idle()
+        image.figure.canvas.flush_events()
+        return True
@@ -0,0 +1,438 @@
+"""
+write frames to disk as they arrive, so recording length is limited by disk rather than RAM.
+
+A recorder is used as
+
+    with H5Recorder("test.h5", (cam.ypix, cam.xpix)) as rec:
+        for image, counter, timestamp in cam.frames():
+            rec.append(image, counter, timestamp, exposure=exptime, gain=gain)
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+import struct
+from typing import NamedTuple
+
+import numpy as np
+
+from .stats import FrameStats
+
+COMPRESSION = ("lzf", "gzip", "none")
+
+# private TIFF tags for per-page metadata, alongside EXIF ExposureTime and GainControl
+TAG_EXPOSURE = 33434
+TAG_GAIN = 41991
+TAG_COUNTER = 65000
+TAG_TIMESTAMP = 65001
+
+# raw container: fixed header, frames back to back, per-frame index after the last frame
+RAW_MAGIC = b"SMXRAW01"
+RAW_HEADER = struct.Struct("<8sHHIIHHIIQQ")
+RAW_DATA = 4096  # first frame offset, page aligned for memory mapping
+RAW_INDEX = np.dtype(
+    [("counter", "<i8"), ("timestamp", "<f8"), ("exposure", "<f4"), ("gain", "<i4", (4,))]
+)
+
+
+def _gainvalues(gain: dict[str, int] | None) -> list[int]:
+    """g1 red g2 blue, as returned by Camera.getGain"""
+    if gain is None:
+        return [-1] * 4
+    return list(gain.values())
+
+
+class H5Recorder:
+    """
+    Append frames to a resizable chunked /images dataset, one HDF5 chunk per chunkframes frames.
+    Frames are buffered until a chunk is full, then written with one resize and one write.
+
+    Per-frame metadata, one element per frame:
+
+    * /framecounter: camera frame counter (-1 if unknown)
+    * /timestamp: host time [s] (NaN if unknown)
+    * /exposure: exposure [ms] (NaN if unknown)
+    * /gain: g1 red g2 blue gains (-1 if unknown)
+    * /stats/mean, /stats/max, /stats/saturated, /stats/hist: pysumix.stats.framestats
+      per channel, once a frame is appended with stats (NaN, -1, NaN, 0 for frames without)
+
+    compression: "lzf" is fast with modest ratio, "gzip" is smaller but slow at frame rate,
+    "none" is fastest.
+    """
+
+    def __init__(
+        self,
+        fn: Path | str,
+        shape: tuple[int, ...],
+        dtype=np.uint8,
+        compression: str | None = "lzf",
+        chunkframes: int = 1,
+    ):
+        import h5py
+
+        if compression is None:
+            compression = "none"
+        if compression not in COMPRESSION:
+            raise ValueError(f"compression must be one of {COMPRESSION}")
+        if chunkframes < 1:
+            raise ValueError("chunkframes must be at least 1")
+
+        self.fn = Path(fn).expanduser()
+        self.shape = tuple(shape)
+        self.chunkframes = chunkframes
+        self.nframes = 0
+
+        self.f = h5py.File(self.fn, "w")
+        self.images = self.f.create_dataset(
+            "/images",
+            shape=(0,) + self.shape,
+            maxshape=(None,) + self.shape,
+            dtype=dtype,
+            chunks=(chunkframes,) + self.shape,
+            compression=None if compression == "none" else compression,
+        )
+        self.images.attrs["CLASS"] = np.bytes_("IMAGE")
+        self.images.attrs["IMAGE_VERSION"] = np.bytes_("1.2")
+        if len(self.shape) == 3 and self.shape[-1] == 3:
+            self.images.attrs["IMAGE_SUBCLASS"] = np.bytes_("IMAGE_TRUECOLOR")
+            self.images.attrs["INTERLACE_MODE"] = np.bytes_("INTERLACE_PIXEL")
+        else:
+            self.images.attrs["IMAGE_SUBCLASS"] = np.bytes_("IMAGE_GRAYSCALE")
+        self.images.attrs["DISPLAY_ORIGIN"] = np.bytes_("LL")
+        self.images.attrs["IMAGE_WHITE_IS_ZERO"] = np.uint8(0)
+
+        metachunk = max(chunkframes, 1024)
+        self.meta = {
+            name: self.f.create_dataset(
+                "/" + name, shape=(0,) + s, maxshape=(None,) + s, dtype=t, chunks=(metachunk,) + s
+            )
+            for name, s, t in (
+                ("framecounter", (), np.int64),
+                ("timestamp", (), np.float64),
+                ("exposure", (), np.float32),
+                ("gain", (4,), np.int32),
+            )
+        }
+
+        # one chunk of frames and metadata, written out when full
+        self._buf = np.empty((chunkframes,) + self.shape, dtype=dtype)
+        self._metabuf = {
+            name: np.empty((chunkframes,) + d.shape[1:], d.dtype) for name, d in self.meta.items()
+        }
+        self._nbuf = 0
+        self._stats: dict[str, float] = {}  # statistics fields and their fill value
+
+    def _addstats(self, stats: FrameStats):
+        """statistics datasets, created by the first frame that has them"""
+        nrow = stats.hist.shape[0]
+        for field, t, fill in (
+            ("mean", np.float32, np.nan),
+            ("max", np.int32, -1),
+            ("saturated", np.float32, np.nan),
+            ("hist", np.uint32, 0),
+        ):
+            s = getattr(stats, field).shape
+            if s[0] != nrow:
+                raise ValueError(f"stats {field} has {s[0]} rows, expected {nrow}")
+            name = "stats/" + field
+            # earlier frames, on disk or buffered, read as the fill value
+            self.meta[name] = self.f.create_dataset(
+                "/" + name,
+                shape=(self.nframes,) + s,
+                maxshape=(None,) + s,
+                dtype=t,
+                chunks=(max(self.chunkframes, 16),) + s,
+                fillvalue=fill,
+            )
+            self._metabuf[name] = np.full((self.chunkframes,) + s, fill, dtype=t)
+            self._stats[field] = fill
+
+    def append(
+        self,
+        image: np.ndarray,
+        counter: int | None = None,
+        timestamp: float | None = None,
+        exposure: float | None = None,
+        gain: dict[str, int] | None = None,
+        stats: FrameStats | None = None,
+    ):
+        if image.shape != self.shape:
+            raise ValueError(f"expected frame shape {self.shape}, got {image.shape}")
+        if stats is not None and not self._stats:
+            self._addstats(stats)
+
+        i = self._nbuf
+        self._buf[i] = image
+        self._metabuf["framecounter"][i] = -1 if counter is None else counter
+        self._metabuf["timestamp"][i] = np.nan if timestamp is None else timestamp
+        self._metabuf["exposure"][i] = np.nan if exposure is None else exposure
+        self._metabuf["gain"][i] = _gainvalues(gain)
+        for field, fill in self._stats.items():
+            self._metabuf["stats/" + field][i] = fill if stats is None else getattr(stats, field)
+        self._nbuf += 1
+
+        if self._nbuf == self.chunkframes:
+            self.flush()
+
+    def flush(self):
+        """write buffered frames to the file"""
+        k = self._nbuf
+        if k == 0:
+            return
+
+        n = self.nframes
+        self.images.resize(n + k, axis=0)
+        self.images[n : n + k] = self._buf[:k]
+        for name, d in self.meta.items():
+            d.resize(n + k, axis=0)
+            d[n : n + k] = self._metabuf[name][:k]
+
+        self.nframes = n + k
+        self._nbuf = 0
+
+    def close(self):
+        if self.f.id.valid:
+            self.flush()
+            self.f.close()
+
+    def __enter__(self) -> H5Recorder:
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TiffRecorder:
+    """
+    Append one TIFF page per frame as frames arrive, each page carrying its own
+    exposure, gain, frame counter and timestamp tags plus a text description.
+
+    compression: None (fastest, default) or a tifffile codec name such as "zlib", "lzw", "zstd",
+    with level trading speed for size.
+    bigtiff: BigTIFF is required past 4 GB. None picks classic TIFF only when nframes is given
+    and the recording fits, since the format can't change once the file is started.
+    """
+
+    def __init__(
+        self,
+        fn: Path | str,
+        shape: tuple[int, ...],
+        dtype=np.uint8,
+        compression: str | None = None,
+        level: int | None = None,
+        bigtiff: bool | None = None,
+        nframes: int | None = None,
+    ):
+        import tifffile
+
+        self.fn = Path(fn).expanduser()
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.nframes = 0
+
+        if bigtiff is None:
+            if nframes is None:
+                bigtiff = True
+            else:
+                # leave headroom for the per-page IFDs and tags
+                bigtiff = nframes * np.prod(self.shape) * self.dtype.itemsize > 0.95 * 2**32
+        self.bigtiff = bigtiff
+
+        self.photometric = "rgb" if len(self.shape) == 3 and self.shape[-1] == 3 else "minisblack"
+        self.compression = compression
+        self.compressionargs = None if level is None else {"level": level}
+
+        self.tif = tifffile.TiffWriter(self.fn, bigtiff=bigtiff)
+
+    def append(
+        self,
+        image: np.ndarray,
+        counter: int | None = None,
+        timestamp: float | None = None,
+        exposure: float | None = None,
+        gain: dict[str, int] | None = None,
+    ):
+        if image.shape != self.shape:
+            raise ValueError(f"expected frame shape {self.shape}, got {image.shape}")
+
+        desc = []
+        tags: list[tuple] = []
+        if exposure is not None:
+            desc.append(f"exposure_sec {exposure / 1000:0.6f}")
+            tags.append((TAG_EXPOSURE, "f", 1, exposure, True))
+        if gain is not None:
+            desc.append(f"gains_(g1 red g2 blue) {_gainvalues(gain)}")
+            tags.append((TAG_GAIN, "f", 4, _gainvalues(gain), True))
+        if counter is not None:
+            desc.append(f"framecounter {counter}")
+            tags.append((TAG_COUNTER, "I", 1, counter, True))
+        if timestamp is not None:
+            desc.append(f"timestamp {timestamp:.6f}")
+            tags.append((TAG_TIMESTAMP, "d", 1, timestamp, True))
+
+        self.tif.write(
+            image.astype(self.dtype, copy=False),
+            photometric=self.photometric,
+            compression=self.compression,
+            compressionargs=self.compressionargs,
+            description=",  ".join(desc) if desc else None,
+            extratags=tags,
+            metadata=None,
+        )
+        self.nframes += 1
+
+    def close(self):
+        self.tif.close()
+
+    def __enter__(self) -> TiffRecorder:
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RawRecorder:
+    """
+    Write frames as-is, back to back after a fixed header, for the highest write throughput:
+    no encoding, chunking or compression, one sequential write() per frame straight from the
+    grabbed buffer. read_raw() maps the file back as an (N, H, W) stack.
+
+    The header records the frame size, bit depth, decimation and ROI origin.
+    The frame counter / timestamp / exposure / gain index (RAW_INDEX) is kept in memory and
+    written after the frames on close, along with the frame count.
+    A file that was not closed still reads back, without its index.
+    """
+
+    def __init__(
+        self,
+        fn: Path | str,
+        shape: tuple[int, ...],
+        dtype=np.uint8,
+        bits: int | None = None,
+        decim: int = 1,
+        startx: int = 0,
+        starty: int = 0,
+    ):
+        self.fn = Path(fn).expanduser()
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        # uint32 for binned 10-bit frames
+        if len(self.shape) != 2 or self.dtype not in (np.uint8, np.uint16, np.uint32):
+            raise ValueError("raw files hold 2-D uint8, uint16 or uint32 frames")
+
+        self.header = dict(
+            bits=8 * self.dtype.itemsize if bits is None else bits,
+            xpix=self.shape[1],
+            ypix=self.shape[0],
+            decim=decim,
+            itemsize=self.dtype.itemsize,
+            startx=startx,
+            starty=starty,
+        )
+        self.nframes = 0
+        self._index: list[tuple] = []
+
+        self.f = self.fn.open("wb")
+        self._writeheader(0, 0)
+        self.f.seek(RAW_DATA)
+
+    def _writeheader(self, nframes: int, index: int):
+        h = self.header
+        self.f.seek(0)
+        self.f.write(
+            RAW_HEADER.pack(
+                RAW_MAGIC,
+                1,
+                h["bits"],
+                h["xpix"],
+                h["ypix"],
+                h["decim"],
+                h["itemsize"],
+                h["startx"],
+                h["starty"],
+                nframes,
+                index,
+            )
+        )
+
+    def append(
+        self,
+        image: np.ndarray,
+        counter: int | None = None,
+        timestamp: float | None = None,
+        exposure: float | None = None,
+        gain: dict[str, int] | None = None,
+    ):
+        if image.shape != self.shape or image.dtype != self.dtype:
+            raise ValueError(f"expected {self.dtype} frame shape {self.shape}, got {image.shape}")
+
+        # the frame's own memory, with no intermediate copy
+        self.f.write(np.ascontiguousarray(image).data)
+        self._index.append(
+            (
+                -1 if counter is None else counter,
+                np.nan if timestamp is None else timestamp,
+                np.nan if exposure is None else exposure,
+                _gainvalues(gain),
+            )
+        )
+        self.nframes += 1
+
+    def close(self):
+        if self.f.closed:
+            return
+
+        offset = self.f.tell()
+        # header first, so a file still marked unclosed has nothing after its frames,
+        # and an interrupted index write leaves the frame count in the header
+        self._writeheader(self.nframes, offset)
+        self.f.seek(offset)
+        self.f.write(np.array(self._index, dtype=RAW_INDEX).tobytes())
+        self.f.close()
+
+    def __enter__(self) -> RawRecorder:
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RawRecording(NamedTuple):
+    images: np.ndarray  # read-only np.memmap (N, H, W)
+    meta: np.ndarray | None  # RAW_INDEX per frame, None if the file wasn't fully closed
+    header: dict[str, int]
+
+
+def read_raw(fn: Path | str) -> RawRecording:
+    """memory map a RawRecorder file; frames are only read from disk as they are used"""
+    fn = Path(fn).expanduser()
+
+    with fn.open("rb") as f:
+        fields = RAW_HEADER.unpack(f.read(RAW_HEADER.size))
+    if fields[0] != RAW_MAGIC:
+        raise ValueError(f"{fn} is not a pysumix raw file")
+
+    names = ("version", "bits", "xpix", "ypix", "decim", "itemsize", "startx", "starty")
+    header = dict(zip(names, fields[1:-2]))
+    nframes, offset = fields[-2:]
+
+    dtype = np.dtype(f"<u{header['itemsize']}")
+    shape = (header["ypix"], header["xpix"])
+    framebytes = dtype.itemsize * shape[0] * shape[1]
+
+    size = fn.stat().st_size
+    index = None
+    if offset:
+        # the index is missing if the close was interrupted while writing it
+        if size >= offset + nframes * RAW_INDEX.itemsize:
+            index = np.fromfile(fn, dtype=RAW_INDEX, count=nframes, offset=offset)
+    else:
+        # not closed: recover the complete frames that made it to disk
+        nframes = max((size - RAW_DATA) // framebytes, 0)
+
+    if nframes == 0:
+        images = np.empty((0,) + shape, dtype=dtype)
+    else:
+        images = np.memmap(fn, dtype=dtype, mode="r", offset=RAW_DATA, shape=(nframes,) + shape)
+
+    return RawRecording(images, index, header)
@@ -1,31 +1,84 @@
 import logging
-from numpy import around, empty
+from numpy import around, empty, array, multiply, ndindex, uint8, uint16, uint32
 
+# ITU-R BT.601 luma weights of R, G, B in 16-bit fixed point, summing to 1 << 16
+LUMA = array([19595, 38470, 7471], dtype=uint32)
 
-def rgb2gray(rgb):
+
+def luma(r, g, b, out=None, scratch=None):
+    """
+    0.299 r + 0.587 g + 0.114 b of same-shape integer planes, rounded, in fixed point:
+    for up to 16-bit input the weighted sum is exact in uint32.
+    out: result array, any integer dtype the values fit (by default uint32)
+    scratch: two uint32 working arrays shaped like r, reused across calls
+    """
+    if scratch is None:
+        scratch = empty((2,) + r.shape, dtype=uint32)
+    acc, tmp = scratch
+
+    multiply(r, LUMA[0], out=acc)
+    acc += multiply(g, LUMA[1], out=tmp)
+    acc += multiply(b, LUMA[2], out=tmp)
+    acc += uint32(1 << 15)
+    acc >>= 16
+
+    if out is None:
+        return acc.copy()
+    out[...] = acc
+    return out
+
+
+def rgb2gray(rgb, out=None, scratch=None):
     """
     http://en.wikipedia.org/wiki/Grayscale#Converting_color_to_grayscale
     These coefficients may not be the ones desired for your system, but may well
     be better than just averaging RGB channels.
 
+    rgb: (..., 3) image or stack of images, in one call.
+    uint8 and uint16 use the fixed-point LUMA weights, rounded, keeping the input dtype.
+    Floating point is weighted in its own precision, without rounding.
+    out: optional gray array, shape rgb.shape[:-1]
+    scratch: working arrays reused across calls, so that with out nothing is allocated:
+        (2, H, W) uint32 for integer input, (H, W) of the input dtype for floating point
+
     Note: Transparency RGBA is discarded
     """
     ndim = rgb.ndim
     if ndim == 2:
         logging.info("assuming its already gray since ndim=2")
+        if out is None:
+            return rgb
+        out[...] = rgb
+        return out
 
-    elif ndim == 3 and rgb.shape[-1] == 3:  # this is the normal case
-        return around(rgb[..., :].dot([0.299, 0.587, 0.114])).astype(rgb.dtype)
-    elif ndim == 3 and rgb.shape[-1] == 4:
+    if rgb.shape[-1] == 4:
         logging.info("assuming this is an RGBA image, discarding alpha channel")
-        return rgb2gray(rgb[..., :-1])
-    elif ndim == 4 and rgb.shape[-1] in (3, 4):
-        logging.info(f"iterating over {rgb.shape[0]} frames")
-        gray = empty(rgb.shape[:3], dtype=rgb.dtype)
-        for i, f in enumerate(rgb):
-            gray[i, ...] = rgb2gray(f)
-        return gray
-    else:
+    elif ndim < 2 or rgb.shape[-1] != 3:
         raise TypeError(f"unsure what you want with shape {rgb.shape}")
 
-    return rgb
+    if out is None:
+        out = empty(rgb.shape[:-1], dtype=rgb.dtype)
+    elif out.shape != rgb.shape[:-1]:
+        raise ValueError(f"out must have shape {rgb.shape[:-1]}, not {out.shape}")
+
+    # frame by frame, reusing the working arrays, which keeps them in cache
+    frames = ndindex(rgb.shape[:-3])
+    if rgb.dtype in (uint8, uint16):
+        if scratch is None:
+            scratch = empty((2,) + rgb.shape[-3:-1], dtype=uint32)
+        for k in frames:
+            f = rgb[k]
+            luma(f[..., 0], f[..., 1], f[..., 2], out[k], scratch)
+    elif rgb.dtype.kind == "f":
+        w = array([0.299, 0.587, 0.114], dtype=rgb.dtype)
+        tmp = empty(rgb.shape[-3:-1], dtype=rgb.dtype) if scratch is None else scratch
+        for k in frames:
+            f = rgb[k]
+            o = multiply(f[..., 0], w[0], out=out[k])
+            o += multiply(f[..., 1], w[1], out=tmp)
+            o += multiply(f[..., 2], w[2], out=tmp)
+    else:
+        for k in frames:
+            out[k] = around(rgb[k][..., :3].dot([0.299, 0.587, 0.114]))
+
+    return out
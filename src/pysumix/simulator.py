@@ -0,0 +1,277 @@
+"""
+Pure-Python stand-in for the Sumix SMXM8X.dll, for running and benchmarking the
+acquisition pipeline without a camera or Windows:
+
+    cam = Camera(dll=SimulatedDLL(fps=60))
+
+It implements the Cx* calls used by Camera and Convert with the same argument
+conventions (ctypes values, byref() outputs, raw buffer pointers) and return codes
+(nonzero on success). CxGrabVideoFrame paces itself to the simulated frame rate and
+writes synthetic GRBG frames of a moving scene.
+"""
+
+from __future__ import annotations
+
+import ctypes as ct
+import threading
+import time
+
+import numpy as np
+
+MAX_WIDTH = 1280
+MAX_HEIGHT = 1024
+
+
+def _value(arg):
+    """plain Python value of a ctypes argument"""
+    return getattr(arg, "value", arg)
+
+
+def _out(arg):
+    """the ctypes object behind a byref() argument"""
+    return getattr(arg, "_obj", arg)
+
+
+def _buffer(ptr, nbytes: int) -> np.ndarray:
+    """uint8 NumPy view of a raw buffer pointer passed to the DLL"""
+    addr = _value(ptr)
+    return np.ctypeslib.as_array(ct.cast(addr, ct.POINTER(ct.c_ubyte)), shape=(nbytes,))
+
+
+class SimulatedDLL:
+    """
+    fps: frame rate while streaming; frames are also no faster than the exposure time
+    color: color (Bayer GRBG) or monochrome sensor
+    latency: seconds added to every control call, to mimic the USB round trip
+    """
+
+    def __init__(
+        self, fps: float = 30.0, color: bool = True, latency: float = 0.0, nsynth: int = 8
+    ):
+        self.fps = fps
+        self.color = color
+        self.latency = latency
+        self.nsynth = nsynth
+
+        self.params = dict(
+            StartX=0,
+            StartY=0,
+            Width=MAX_WIDTH,
+            Height=MAX_HEIGHT,
+            Decimation=1,
+            MirrorV=0,
+            MirrorH=0,
+        )
+        self.active = dict(self.params)
+        self.exposure = 10.0  # ms
+        self.gain = [0, 0, 0, 0]
+        self.frequency = 1
+        self.tenbit = False
+        self.convtab = (np.arange(1024) >> 2).astype(np.uint8)
+
+        self.isopen = False
+        self.streaming = False
+        self.nopen = 0  # CxOpenDevice calls, to count USB round trips
+        self.ncontrol = 0  # control calls (settings and info) made on an open device
+        self._t0 = 0.0
+        self._last = 0
+        self._lock = threading.Lock()
+        self._frames: np.ndarray | None = None
+
+    # %% device
+
+    def _control(self):
+        self.ncontrol += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self.isopen
+
+    def CxOpenDevice(self, cid=None):
+        self.nopen += 1
+        self.isopen = True
+        return 1
+
+    def CxCloseDevice(self, h):
+        self.isopen = False
+
+    def CxGetCameraInfo(self, h, info):
+        info = _out(info)
+        info.SensorType = 0
+        info.MaxWidth = MAX_WIDTH
+        info.MaxHeight = MAX_HEIGHT
+        return self._control()
+
+    def CxGetCameraInfoEx(self, h, info):
+        info = _out(info)
+        info.HWModelID = 0
+        info.HWVersion = 0
+        info.HWSerial = 0
+        return self._control()
+
+    # %% screen parameters
+
+    def CxGetScreenParams(self, h, params):
+        p = _out(params)
+        for k, v in self.params.items():
+            setattr(p, k, v)
+        p.ColorDeep = 24 if self.color else 8
+        return self._control()
+
+    def CxSetScreenParams(self, h, params):
+        p = _out(params)
+        if not (
+            1 <= p.Decimation <= 8
+            and 0 < p.Width
+            and 0 < p.Height
+            and p.StartX + p.Width <= MAX_WIDTH
+            and p.StartY + p.Height <= MAX_HEIGHT
+        ):
+            return 0
+        self.params = {k: getattr(p, k) for k in self.params}
+        return self._control()
+
+    def CxActivateScreenParams(self, h):
+        self.active = dict(self.params)
+        self._frames = None
+        return self._control()
+
+    def CxSetFrequency(self, h, freq):
+        self.frequency = _value(freq)
+        return self._control()
+
+    def CxGetFrequency(self, h, freq):
+        _out(freq).value = self.frequency
+        return self._control()
+
+    # %% exposure, gain
+
+    def CxGetExposureMinMaxMs(self, h, emin, emax):
+        _out(emin).value = 0.1
+        _out(emax).value = 10000.0
+        return self._control()
+
+    def CxGetExposureMs(self, h, exp):
+        _out(exp).value = self.exposure
+        return self._control()
+
+    def CxSetExposureMs(self, h, req, exp):
+        self.exposure = min(max(_value(req), 0.1), 10000.0)
+        _out(exp).value = self.exposure
+        return self._control()
+
+    def CxGetGain(self, h, g1, r, g2, b):
+        for arg, v in zip((g1, r, g2, b), self.gain):
+            _out(arg).value = v
+        return self._control()
+
+    def CxSetGain(self, h, g1, r, g2, b):
+        self.gain = [_value(g) for g in (g1, r, g2, b)]
+        return self._control()
+
+    def CxSetAllGain(self, h, gain):
+        self.gain = [_value(gain)] * 4
+        return self._control()
+
+    def CxSetBrightnessContrastGamma(self, h, bright, contrast, gamma):
+        return self._control()
+
+    def CxGetConvertionTab(self, h, buf):
+        _buffer(buf, 1024)[:] = self.convtab
+        return self._control()
+
+    def CxGet10BitsOutput(self, h, tenbit):
+        _out(tenbit).value = self.tenbit
+        return self._control()
+
+    def CxSet10BitsOutput(self, h, tenbit):
+        self.tenbit = bool(_value(tenbit))
+        self._frames = None
+        return self._control()
+
+    # %% streaming
+
+    def CxSetStreamMode(self, h, mode):
+        self.streaming = bool(_value(mode))
+        if self.streaming:
+            self._synthetic()  # before the clock starts, so the first grab isn't delayed
+            self._t0 = time.perf_counter()
+            self._last = 0
+        return self._control()
+
+    def CxGetStreamMode(self, h, mode):
+        _out(mode).value = self.streaming
+        return self._control()
+
+    @property
+    def period(self) -> float:
+        return max(1 / self.fps, self.exposure / 1000)
+
+    def _sensorcount(self) -> int:
+        return int((time.perf_counter() - self._t0) / self.period)
+
+    def CxGetFrameCounter(self, h, count):
+        _out(count).value = self._sensorcount() if self.streaming else self._last
+        return self.isopen
+
+    def CxGrabVideoFrame(self, h, buf, nbytes):
+        """waits for the next frame the sensor completes, like the camera's video stream"""
+        if not (self.isopen and self.streaming):
+            return 0
+
+        frames = self._synthetic()
+        if nbytes != frames[0].nbytes:
+            return 0
+
+        with self._lock:
+            k = max(self._last + 1, self._sensorcount())
+            self._last = k
+        delay = self._t0 + k * self.period - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+        _buffer(buf, nbytes)[:] = frames[k % len(frames)].reshape(-1).view(np.uint8)
+        return 1
+
+    def _synthetic(self) -> np.ndarray:
+        """a short cycle of frames of the current ROI and bit depth, made once per setting"""
+        if self._frames is not None:
+            return self._frames
+
+        p = self.active
+        h = p["Height"] // p["Decimation"]
+        w = p["Width"] // p["Decimation"]
+        top = 1023 if self.tenbit else 255
+        rng = np.random.default_rng(0)
+
+        y, x = np.mgrid[:h, :w]
+        frames = np.empty((self.nsynth, h, w), dtype=np.uint16 if self.tenbit else np.uint8)
+        for i, f in enumerate(frames):
+            # gradients per color moving across the frame, plus sensor noise
+            xs = (x + 8 * i) % w / w
+            scene = 0.2 + 0.6 * xs
+            if self.color:
+                r = 0.1 + 0.8 * y / h
+                b = 1 - xs
+                scene = np.where((y % 2 == 0) & (x % 2 == 1), r, scene)
+                scene = np.where((y % 2 == 1) & (x % 2 == 0), b, scene)
+            f[:] = np.clip(scene * top + rng.normal(0, 0.01 * top, (h, w)), 0, top)
+
+        self._frames = frames
+        return frames
+
+    # %% conversion
+
+    def CxBayerToRgb(self, inbuf, width, height, alg, outbuf):
+        from .demosaic import grbg2rgb
+
+        w = _value(width)
+        h = _value(height)
+        img = _buffer(inbuf, w * h).reshape((h, w))
+        out = _buffer(outbuf, w * h * 3).reshape((h, w, 3))
+
+        alg = _value(alg)
+        if alg in (0, 4):  # monochrome
+            out[:] = img[..., None]
+        else:
+            out[:] = grbg2rgb(img, 2 if alg in (2, 3) else 1)[..., ::-1]  # BGR like the DLL
+        return 1
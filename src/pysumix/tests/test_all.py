@@ -1,11 +1,15 @@
 #!/usr/bin/env python
 import pytest
 from pytest import approx
-from numpy import array, uint8
+from numpy import array, uint8, uint16, uint32, uint64, float32, empty, arange, array_equal
+from numpy import empty_like, minimum, stack, tile
 
 #
-from pysumix.demosaic import demosaic
+from pysumix.demosaic import demosaic, grbg2rgb
 from pysumix.rgb2gray import rgb2gray
+from pysumix.lut import make_lut, apply_lut
+from pysumix.stats import framestats
+from pysumix.binning import binning
 
 # %% global
 testimg = array([[23, 128], [202, 27]], dtype=uint8)
@@ -36,6 +40,61 @@ def test_demosaic_gray():
     assert testimg.dtype == testnear.dtype
 
 
+# %% raw->color, bilinear
+
+
+def test_demosaic_bilinear():
+    # uniformly colored scene: every pixel site must recover the same RGB
+    mosaic = array([[100, 50], [200, 100]], dtype=uint8)
+    frame = tile(mosaic, (3, 4))
+
+    test = demosaic(frame, "", 2)
+
+    assert test.shape == (6, 8, 3)
+    assert (test == array([50, 100, 200], dtype=uint8)).all()
+
+
+# %% stack of frames in one pass, into caller's array
+
+
+@pytest.mark.parametrize("dtype", [uint8, uint16])
+@pytest.mark.parametrize("alg", [1, 2])
+@pytest.mark.parametrize("color", [True, False])
+def test_demosaic_stack(dtype, alg, color):
+    frames = (arange(3 * 4 * 6) * 7 % 251).astype(dtype).reshape((3, 4, 6))
+    out = empty(frames.shape + (3,) if color else frames.shape, dtype=dtype)
+
+    test = demosaic(frames, "", alg, color, out=out)
+    ref = stack([grbg2rgb(f, alg, color) for f in frames])
+
+    assert test is out
+    assert array_equal(test, ref)
+
+
+@pytest.mark.parametrize("dtype", [uint8, uint16])
+@pytest.mark.parametrize("alg", [1, 2, 3, 4])
+def test_demosaic_gray_fused(dtype, alg):
+    frames = (arange(2 * 8 * 10) * 37 % 251).astype(dtype).reshape((2, 8, 10))
+
+    test = demosaic(frames, "", alg, color=False)
+    ref = rgb2gray(demosaic(frames, "", alg))
+
+    assert test.dtype == dtype
+    # fixed-point and float64 weights may round differently
+    assert abs(test.astype(int) - ref).max() <= 1
+
+
+@pytest.mark.parametrize("alg", [1, 2, 3])
+@pytest.mark.parametrize("color", [True, False])
+def test_demosaic_parallel(alg, color):
+    frames = (arange(7 * 4 * 6) * 7 % 251).astype(uint8).reshape((7, 4, 6))
+
+    test = demosaic(frames, "", alg, color, workers=3)
+    ref = demosaic(frames, "", alg, color)
+
+    assert array_equal(test, ref)
+
+
 # %% rgb2gray
 
 
@@ -56,5 +115,112 @@ def test_rgb2gray():
     assert testgray == approx(refalpha)
 
 
+@pytest.mark.parametrize("dtype", [uint8, uint16])
+def test_rgb2gray_stack(dtype):
+    rgb = (arange(2 * 3 * 4 * 3) * 61 % 251).astype(dtype).reshape((2, 3, 4, 3))
+    out = empty(rgb.shape[:-1], dtype=dtype)
+
+    test = rgb2gray(rgb, out=out)
+
+    assert test is out
+    assert test.dtype == dtype
+    # fixed point within rounding of the float64 BT.601 weighting
+    ref = rgb.dot([0.299, 0.587, 0.114])
+    assert abs(test - ref).max() <= 0.5 + 1e-3
+    assert array_equal(test[1], rgb2gray(rgb[1]))
+
+    scratch = empty((2, 3, 4), dtype=uint32)
+    assert array_equal(rgb2gray(rgb, empty_like(out), scratch), test)
+
+
+def test_rgb2gray_float():
+    rgb = array([[[0.5, 0.25, 1.0]]], dtype=float32)
+
+    test = rgb2gray(rgb)
+
+    assert test.dtype == float32
+    assert test[0, 0] == approx(0.299 * 0.5 + 0.587 * 0.25 + 0.114)
+
+    out = empty((1, 1), dtype=float32)
+    assert rgb2gray(rgb, out, scratch=empty((1, 1), dtype=float32)) is out
+    assert array_equal(out, test)
+
+
+# %% 10 -> 8 bit lookup table
+
+
+def test_lut():
+    raw = array([[0, 4, 1023], [512, 2000, 3]], dtype=uint16)
+
+    linear = make_lut()
+    assert apply_lut(raw, linear).tolist() == [[0, 1, 255], [128, 255, 0]]
+
+    out = empty(raw.shape, dtype=uint8)
+    inverted = make_lut(255 - linear)
+    assert apply_lut(raw, inverted, out=out) is out
+    assert out.tolist() == [[255, 254, 0], [127, 0, 255]]
+
+    bright = make_lut(gamma=2.0)
+    assert bright[0] == 0 and bright[-1] == 255
+    assert bright[512] > linear[512]
+
+    # a stack spanning several row chunks, and a single row
+    frames = arange(3 * 300 * 500, dtype=uint16).reshape((3, 300, 500)) % 1100
+    assert array_equal(apply_lut(frames, bright), bright[minimum(frames, 1023)])
+    assert array_equal(apply_lut(frames[0, 0], bright), bright[minimum(frames[0, 0], 1023)])
+
+
+def test_framestats():
+    # GRBG cells: green 10, red 200, blue 30, second green 255 (saturated)
+    raw = tile(array([[10, 200], [30, 255]], dtype=uint8), (4, 6))
+
+    s = framestats(raw, step=1)
+    assert s.hist.shape == (4, 256)
+    assert s.mean.tolist() == [10, 200, 255, 30]  # g1 r g2 b
+    assert s.max.tolist() == [10, 200, 255, 30]
+    assert s.saturated.tolist() == [0, 0, 1, 0]
+    assert s.hist[1, 200] == 4 * 6
+
+    half = framestats(raw)  # every other cell
+    assert half.hist.sum(axis=1).tolist() == [2 * 3] * 4
+    assert array_equal(half.mean, s.mean)
+
+    gray = framestats(raw, color=False, step=1, saturation=200)
+    assert gray.hist.shape == (1, 256)
+    assert gray.saturated[0] == approx(0.5)
+
+    raw10 = array([[0, 1023], [512, 2000]], dtype=uint16)  # 2000: stray high bits
+    s10 = framestats(raw10, color=False, step=1)
+    assert s10.hist.shape == (1, 1024)
+    assert s10.max[0] == 1023 and s10.saturated[0] == 0.5
+
+
+def test_binning():
+    # GRBG cells: green 10, red 200, blue 30, second green 250; one extra row and column
+    raw = tile(array([[10, 200], [30, 250]], dtype=uint8), (4, 6))[:7, :11]
+
+    bayer = binning(raw, 2)
+    assert bayer.dtype == uint16 and bayer.shape == (2, 4)  # cropped to whole 4x4 superpixels
+    assert bayer.tolist() == [[40, 800] * 2, [120, 1000] * 2]
+
+    rgb = binning(raw, 2, "rgb")
+    assert rgb.shape == (1, 2, 3)
+    assert rgb[0, 0].tolist() == [800, 520, 120]  # green: mean of the two green sums
+
+    assert binning(raw, 2, "gray").tolist() == [[40 + 800 + 120 + 1000] * 2]
+    assert array_equal(binning(raw, 1), raw[:6, :10])
+
+    frames = stack([raw, 255 - raw]).astype(uint16)  # 16-bit: sums as uint32
+    out = empty((2, 2, 4), dtype=uint64)
+    assert binning(frames, 2, out=out) is out
+    assert array_equal(out[0], bayer)
+    assert binning(frames, 2).dtype == uint32
+
+    with pytest.raises(ValueError):
+        binning(raw, 2, out=empty((2, 4), dtype=uint8))  # too narrow for the sums
+    with pytest.raises(ValueError):
+        binning(raw, 4)  # smaller than one 8x8 superpixel
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -0,0 +1,343 @@
+#!/usr/bin/env python
+import asyncio
+import threading
+import time
+
+import pytest
+from pytest import approx
+from numpy import empty, ndarray, uint8, uint16, array_equal
+
+#
+from pysumix import Camera, Convert
+from pysumix.aiocamera import AsyncCamera
+from pysumix.demosaic import demosaic
+from pysumix.acquire import Frame
+from pysumix.group import MIN_TOLERANCE, NSAMPLE, CameraGroup, _period
+from pysumix.metrics import Metrics
+from pysumix.preview import Preview
+from pysumix.simulator import SimulatedDLL
+
+
+@pytest.fixture
+def sim():
+    return SimulatedDLL(fps=500, nsynth=2)
+
+
+def fastcam(sim, **kwargs) -> Camera:
+    cam = Camera(64, 48, dll=sim, **kwargs)
+    cam.setExposure(0.5)
+    return cam
+
+
+def test_session(sim):
+    cam = Camera(dll=sim)
+    assert sim.nopen == 1  # all of __init__ in one device session
+    assert (cam.xpix, cam.ypix) == (1280, 1024)
+
+    with cam:
+        cam.setExposure(2.0)
+        assert cam.getExposure() == approx(2.0)
+        cam.startStream()
+        cam.grabFrame()
+        cam.getExposure()  # must not close the streaming handle
+        assert cam.isopen
+    assert sim.nopen == 2
+    assert not cam.isopen and not cam.streaming
+
+
+def test_configure(sim):
+    cam = Camera(dll=sim)
+    nopen = sim.nopen
+    ncontrol = sim.ncontrol
+
+    cam.configure(width=640, height=480, decim=2, exposure=3.0, gain=5, frequency=0, tenbit=True)
+    assert sim.nopen == nopen + 1
+    # set + activate + read back the ROI, then one call per other setting
+    assert sim.ncontrol == ncontrol + 7
+    assert (cam.xpix, cam.ypix, cam.dtype) == (320, 240, uint16)
+
+    # reads come from the shadow state
+    ncontrol = sim.ncontrol
+    assert cam.getParams().Width == 640
+    assert cam.getExposure() == approx(3.0)
+    assert cam.getGain() == {"g1": 5, "gr": 5, "gg2": 5, "gb": 5}
+    assert cam.getFrequency() == "12 MHz"
+    assert cam.get10BitsOutput()
+    assert sim.ncontrol == ncontrol
+
+    sim.exposure = 7.0  # changed behind the camera object's back
+    assert cam.getExposure() == approx(3.0)
+    cam.invalidate("exposure")
+    assert cam.getExposure() == approx(7.0)
+
+    # row time changes with the pixel clock and ROI, so exposure is read again after them
+    for change in ({"frequency": 0}, {"width": 640}):
+        sim.exposure = 8.0
+        cam.configure(**change)
+        ncontrol = sim.ncontrol
+        assert cam.getExposure() == approx(8.0)
+        assert sim.ncontrol == ncontrol + 1
+
+    with cam:
+        cam.startStream()
+        assert cam.grabFrame().shape == (240, 320)
+        cam.configure(exposure=1.0)
+        with pytest.raises(RuntimeError):
+            cam.configure(decim=1)
+
+
+def test_grabframe_ring(sim):
+    cam = fastcam(sim, nring=2)
+    cam.startStream()
+
+    f1 = cam.grabFrame()
+    f2 = cam.grabFrame()
+    f3 = cam.grabFrame()
+    assert f1.shape == (48, 64) and f1.dtype == uint8
+    assert f1 is not f2 and f3 is f1
+
+    out = empty((48, 64), dtype=uint8)
+    assert cam.grabFrame(out=out) is out
+    with pytest.raises(ValueError):
+        cam.grabFrame(out=empty((48, 64), dtype=uint16))
+    cam.stopStream()
+
+
+@pytest.mark.parametrize("policy", ["drop-oldest", "drop-newest"])
+def test_acquisition_drops(sim, policy):
+    cam = fastcam(sim)
+
+    with cam.acquire(maxsize=2, policy=policy) as acq:
+        for i, frame in enumerate(acq):
+            time.sleep(0.01)  # slow consumer
+            if i == 5:
+                break
+    stats = acq.stats()
+
+    assert stats["dropped"] > 0
+    assert stats["grabbed"] == stats["dropped"] + stats["consumed"] + stats["queued"]
+    assert not cam.streaming
+
+
+def test_frames(sim):
+    cam = fastcam(sim)
+
+    frames = [(f.image.copy(), f.counter, f.timestamp) for f in cam.frames(10, timeout=1.0)]
+
+    assert len(frames) == 10
+    counters = [c for _, c, _ in frames]
+    times = [t for _, _, t in frames]
+    assert counters == sorted(counters)
+    assert times == sorted(times)
+    assert not cam.streaming
+
+
+def test_tenbit(sim):
+    cam = fastcam(sim, tenbit=True)
+    assert cam.bits == 10
+
+    cam.startStream()
+    frame = cam.grabFrame()
+    cam.stopStream()
+
+    assert frame.dtype == uint16
+    assert frame.max() > 255
+
+    assert array_equal(cam.to8bit(frame), sim.convtab[frame])
+    n = sim.nopen
+    cam.to8bit(frame)
+    assert sim.nopen == n  # conversion table served from cache
+
+    cam.invalidate()
+    cam.to8bit(frame)
+    assert sim.nopen == n + 1  # table read again after the camera may have changed
+
+
+def test_metrics(sim, tmp_path):
+    metrics = Metrics()
+    cam = fastcam(sim, metrics=metrics)
+
+    for frame in cam.frames(5):
+        demosaic(frame.image, metrics=metrics)
+        with metrics.stage("write"):
+            pass
+
+    summary = metrics.summary()
+    assert summary["grab"]["count"] >= 5
+    assert summary["demosaic"]["count"] == summary["write"]["count"] == 5
+    assert summary["frame"]["count"] >= 5
+    assert summary["frame"]["missed"] >= 0
+
+    metrics.save(tmp_path / "trace.csv")
+    metrics.save(tmp_path / "trace.json")
+    lines = (tmp_path / "trace.csv").read_text().splitlines()
+    assert lines[0] == "time,stage,duration,counter,gap,queued"
+    assert len(lines) == len(metrics.events) + 1
+
+
+def test_latest_copy_unlocked(sim):
+    cam = fastcam(sim)
+    got = []
+
+    class Probe(ndarray):
+        def __setitem__(self, key, value):
+            # another consumer isn't held up by a latest() copy in progress
+            t = threading.Thread(target=lambda: got.append(acq.get(1.0)))
+            t.start()
+            t.join(2.0)
+            self.unlocked = bool(got)
+            super().__setitem__(key, value)
+
+    with cam.acquire() as acq:
+        frame = acq.get(1.0)
+        out = empty(frame.image.shape, dtype=frame.image.dtype).view(Probe)
+        latest = acq.latest(out)
+        assert latest is not None and latest.image is out
+        assert out.unlocked
+
+
+@pytest.mark.parametrize("tenbit", [False, True])
+def test_preview(sim, tenbit):
+    cam = fastcam(sim, tenbit=tenbit)
+
+    with cam.acquire(maxsize=2, policy="drop-oldest") as acq:
+        tic = time.perf_counter()
+        with Preview(acq, rate=20, step=4) as pv:
+            time.sleep(0.3)
+            shown = pv.poll()
+            latest = acq.latest()
+        elapsed = time.perf_counter() - tic
+
+    # each display image a distinct frame, no more often than the rate cap,
+    # without taking frames from the queue
+    assert 1 <= pv.prepared <= 20 * elapsed + 1
+    assert acq.grabbed >= pv.prepared
+    assert acq.consumed == 0
+
+    assert shown is not None and shown.shape == (12, 16, 3) and shown.dtype == uint8
+    assert latest is not None and latest.image.dtype == cam.dtype
+    red = latest.image[0::4, 1::4]
+    assert array_equal(pv.prepare(latest.image)[..., 0], cam.to8bit(red) if tenbit else red)
+
+
+def test_preview_odd_size(sim):
+    cam = Camera(61, 45, dll=sim)  # odd ROI: the last row and column are a partial Bayer cell
+
+    with cam.acquire() as acq:
+        pv = Preview(acq, step=4)
+        frame = acq.get()
+        assert frame is not None
+        assert pv.prepare(frame.image).shape == pv.shape == (11, 15, 3)
+
+
+def test_camera_group():
+    fast = SimulatedDLL(fps=400, nsynth=2)
+    slow = SimulatedDLL(fps=100, nsynth=2)
+    cams = [Camera(64, 48, dll=dll, cid=i) for i, dll in enumerate((fast, slow))]
+    assert cams[1].cid == 1
+
+    with CameraGroup(cams) as group:
+        group.configure(exposure=0.5)
+        tuples = [tuple(f.timestamp for f in frames) for frames in group.frames(10)]
+
+    assert len(tuples) == group.matched == 10
+    assert group.tolerance >= MIN_TOLERANCE
+    # one frame per camera, paired within the group's own tolerance
+    assert all(abs(a - b) <= group.tolerance for a, b in tuples)
+    assert group.skew <= group.tolerance
+    # every frame read was either used to estimate the period, matched or discarded
+    for cam in group.stats()["cameras"]:
+        assert cam["consumed"] == NSAMPLE + 10 + cam["discarded"]
+    assert not (fast.isopen or slow.isopen)
+
+
+def test_group_period():
+    period = 0.01
+    # two frames the camera had buffered, then one dropped frame
+    t = [0.0, 0.0001, 0.0002, 0.01, 0.02, 0.04, 0.05, 0.06]
+    counters = [0, 1, 2, 3, 4, 6, 7, 8]
+    frames = [Frame(empty(0), c, ts) for c, ts in zip(counters, t)]
+    assert _period(frames) == approx(period)
+    assert _period([f._replace(counter=None) for f in frames]) == approx(period)
+
+
+def test_group_acquire_error():
+    sims = [SimulatedDLL(nsynth=2) for _ in range(2)]
+    cams = [Camera(64, 48, dll=dll, cid=i) for i, dll in enumerate(sims)]
+    started = []
+    acquire = cams[0].acquire
+
+    def ok(*args):
+        started.append(acquire(*args))
+        return started[-1]
+
+    def fail(*args):
+        raise OSError("USB error")
+
+    cams[0].acquire = ok
+    cams[1].acquire = fail
+
+    with CameraGroup(cams) as group:
+        with pytest.raises(OSError):
+            next(group.frames(1))
+        assert len(started) == 1 and not sims[0].streaming
+
+
+def test_group_open_error():
+    sims = [SimulatedDLL(nsynth=2) for _ in range(2)]
+    cams = [Camera(64, 48, dll=dll, cid=i) for i, dll in enumerate(sims)]
+    sims[1].CxOpenDevice = lambda cid=None: -1  # second camera unplugged
+
+    with pytest.raises(TypeError):
+        with CameraGroup(cams):
+            pass
+    assert not sims[0].isopen and not cams[0].isopen and cams[0]._nsession == 0
+
+
+def test_async_camera():
+    sim = SimulatedDLL(fps=200, nsynth=2, latency=0.02)  # slow USB control round trips
+
+    async def main():
+        events = []
+
+        async def heartbeat():
+            while True:
+                await asyncio.sleep(0.002)
+                events.append("beat")
+
+        async def setExposure(exposure):
+            await cam.setExposure(exposure)
+            events.append("set")
+
+        async with AsyncCamera(Camera(64, 48, dll=sim)) as cam:
+            beat = asyncio.create_task(heartbeat())
+            settings = asyncio.gather(*(setExposure(0.5 + 0.1 * i) for i in range(5)))
+            frames = [f.counter async for f in cam.stream(20)]
+            await settings
+            exposure = await cam.getExposure()
+            beat.cancel()
+
+        return frames, exposure, events
+
+    frames, exposure, events = asyncio.run(main())
+
+    assert len(frames) == 20 and frames == sorted(frames)
+    assert exposure == approx(0.9)  # settings applied in the order they were awaited
+    # the event loop kept running between the serialized control calls
+    sets = [i for i, e in enumerate(events) if e == "set"]
+    assert len(sets) == 5 and "beat" in events[sets[0] : sets[-1]]
+    assert not (sim.isopen or sim.streaming)
+
+
+def test_convert(sim):
+    frame = empty((4, 6), dtype=uint8)
+    frame[:] = [[10, 20] * 3, [30, 10] * 3] * 2
+
+    rgb = Convert(dll=sim).BayerToRgb(frame, 1)
+
+    assert rgb.shape == (4, 6, 3)
+    assert rgb[0, 0].tolist() == [20, 10, 30]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
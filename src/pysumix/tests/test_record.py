@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+import os
+
+import pytest
+from numpy import arange, uint8, uint16, isnan, array_equal, memmap
+
+#
+from pysumix.record import H5Recorder, TiffRecorder, RawRecorder, read_raw
+
+frames = arange(5 * 4 * 6, dtype=uint8).reshape((5, 4, 6))
+gain = {"g1": 1, "gr": 2, "gg2": 3, "gb": 4}
+
+
+@pytest.mark.parametrize("compression", ["lzf", "none"])
+def test_h5recorder(tmp_path, compression):
+    h5py = pytest.importorskip("h5py")
+
+    fn = tmp_path / "rec.h5"
+    with H5Recorder(fn, frames.shape[1:], compression=compression, chunkframes=2) as rec:
+        for i, f in enumerate(frames):
+            rec.append(f, 100 + i, exposure=5.0, gain=gain)
+
+    assert rec.nframes == 5
+
+    with h5py.File(fn, "r") as f:
+        assert array_equal(f["/images"][:], frames)
+        assert f["/images"].chunks == (2, 4, 6)
+        assert f["/framecounter"][:].tolist() == [100, 101, 102, 103, 104]
+        assert isnan(f["/timestamp"][:]).all()
+        assert (f["/exposure"][:] == 5.0).all()
+        assert f["/gain"][-1].tolist() == [1, 2, 3, 4]
+
+
+def test_h5recorder_stats(tmp_path):
+    h5py = pytest.importorskip("h5py")
+    from pysumix.stats import framestats
+
+    fn = tmp_path / "stats.h5"
+    with H5Recorder(fn, frames.shape[1:], chunkframes=2) as rec:
+        rec.append(frames[0])  # before statistics were turned on
+        for f in frames[1:]:
+            rec.append(f, stats=framestats(f))
+
+    with h5py.File(fn, "r") as f:
+        assert f["/stats/hist"].shape == (5, 4, 256)
+        assert f["/stats/mean"].shape == (5, 4)
+        assert isnan(f["/stats/mean"][0]).all() and (f["/stats/max"][0] == -1).all()
+        assert f["/stats/max"][-1].tolist() == framestats(frames[-1]).max.tolist()
+        assert f["/stats/hist"][-1].sum() == 4 * 2  # every other 2x2 cell: 2 per channel
+
+
+def test_h5recorder_10bit(tmp_path):
+    h5py = pytest.importorskip("h5py")
+
+    frames10 = (arange(5 * 4 * 6, dtype=uint16) * 9).reshape((5, 4, 6))
+    assert frames10.max() > 255
+
+    fn = tmp_path / "rec10.h5"
+    with H5Recorder(fn, frames10.shape[1:], uint16) as rec:
+        for f in frames10:
+            rec.append(f)
+
+    with h5py.File(fn, "r") as f:
+        assert f["/images"].dtype == uint16
+        assert array_equal(f["/images"][:], frames10)
+
+
+def test_h5_parallel_demosaic(tmp_path):
+    h5py = pytest.importorskip("h5py")
+    from pysumix.demosaic import demosaic
+
+    fn = tmp_path / "rec.h5"
+    with H5Recorder(fn, frames.shape[1:], chunkframes=2) as rec:
+        for f in frames:
+            rec.append(f)
+
+    with h5py.File(fn, "r") as f:
+        test = demosaic(f["/images"], "", 2, workers=2)
+
+    assert array_equal(test, demosaic(frames, "", 2))
+
+
+@pytest.mark.parametrize("compression", [None, "zlib"])
+def test_tiffrecorder(tmp_path, compression):
+    tifffile = pytest.importorskip("tifffile")
+
+    fn = tmp_path / "rec.tif"
+    with TiffRecorder(fn, frames.shape[1:], compression=compression, nframes=5) as rec:
+        for i, f in enumerate(frames):
+            rec.append(f, 100 + i, exposure=5.0, gain=gain)
+
+    assert not rec.bigtiff
+    assert array_equal(tifffile.imread(fn), frames)
+
+    with tifffile.TiffFile(fn) as t:
+        assert len(t.pages) == 5
+        page = t.pages[3]
+        assert page.tags[65000].value == 103
+        assert page.tags[33434].value == 5.0
+        assert page.tags[41991].value == (1, 2, 3, 4)
+
+
+@pytest.mark.parametrize("dtype", [uint8, uint16])
+def test_rawrecorder(tmp_path, dtype):
+    from pysumix.demosaic import demosaic
+
+    raw = (frames.astype(dtype) * 4).astype(dtype)
+
+    fn = tmp_path / "rec.raw"
+    with RawRecorder(fn, raw.shape[1:], dtype, bits=10, decim=2, startx=8, starty=4) as rec:
+        for i, f in enumerate(raw):
+            rec.append(f, 100 + i, 0.5 * i, exposure=5.0, gain=gain if i else None)
+
+    images, index, header = read_raw(fn)
+    assert isinstance(images, memmap)
+    assert images.dtype == dtype
+    assert array_equal(images, raw)
+    assert header["bits"] == 10 and header["decim"] == 2
+    assert (header["startx"], header["starty"]) == (8, 4)
+    assert index["counter"].tolist() == [100, 101, 102, 103, 104]
+    assert index["timestamp"][-1] == 2.0
+    assert index["gain"][0].tolist() == [-1] * 4
+    assert index["gain"][-1].tolist() == [1, 2, 3, 4]
+
+    assert array_equal(demosaic(images, "", 2), demosaic(raw, "", 2))
+
+
+def test_rawrecorder_unclosed(tmp_path):
+    from pysumix.transcode import read_chunks
+
+    fn = tmp_path / "crash.raw"
+    rec = RawRecorder(fn, frames.shape[1:])
+    for f in frames[:3]:
+        rec.append(f)
+    rec.f.flush()  # as if the process died here
+
+    images, index, _ = read_raw(fn)
+    assert index is None
+    assert array_equal(images, frames[:3])
+
+    rec.close()
+    chunks = list(read_chunks(fn, 2))
+    assert [c[0].shape[0] for c in chunks] == [2, 1]
+    assert chunks[0][1][0] == {"counter": None, "timestamp": None, "exposure": None, "gain": None}
+
+    # close interrupted while writing the index: frames still read back, without it
+    os.truncate(fn, fn.stat().st_size - 1)
+    images, index, _ = read_raw(fn)
+    assert index is None
+    assert array_equal(images, frames[:3])
+
+    # nothing written yet
+    rec = RawRecorder(tmp_path / "empty.raw", frames.shape[1:])
+    rec.f.flush()
+    assert read_raw(rec.fn).images.shape == (0,) + frames.shape[1:]
+    rec.close()
+
+
+@pytest.mark.parametrize("ext", [".h5", ".tif"])
+@pytest.mark.parametrize("color", [True, False])
+def test_transcode(tmp_path, ext, color):
+    pytest.importorskip("h5py" if ext == ".h5" else "tifffile")
+    from pysumix.demosaic import demosaic
+    from pysumix.transcode import transcode, read_chunks
+
+    raw = tmp_path / f"raw{ext}"
+    Recorder = H5Recorder if ext == ".h5" else TiffRecorder
+    with Recorder(raw, frames.shape[1:]) as rec:
+        for i, f in enumerate(frames):
+            rec.append(f, 100 + i, 0.5 * i, exposure=5.0, gain=gain)
+
+    outfn = tmp_path / f"out{ext}"
+    assert transcode(raw, outfn, 2, color, chunk=2) == 5
+
+    test = [(f, m) for c in read_chunks(outfn, 3) for f, m in zip(*c)]
+    assert array_equal([f for f, _ in test], demosaic(frames, "", 2, color))
+    assert [m["counter"] for _, m in test] == [100, 101, 102, 103, 104]
+    assert test[-1][1]["timestamp"] == 2.0
+    assert test[-1][1]["exposure"] == 5.0
+    assert list(test[-1][1]["gain"].values()) == [1, 2, 3, 4]
+
+
+def test_transcode_binning(tmp_path):
+    pytest.importorskip("h5py")
+    from pysumix.binning import binning
+    from pysumix.transcode import transcode, read_chunks
+
+    raw = tmp_path / "raw.h5"
+    with H5Recorder(raw, frames.shape[1:]) as rec:
+        for i, f in enumerate(frames):
+            rec.append(f, 100 + i)
+
+    outfn = tmp_path / "small.h5"
+    assert transcode(raw, outfn, chunk=2, nbin=2) == 5
+
+    test, meta = zip(*((f, m) for c in read_chunks(outfn) for f, m in zip(*c)))
+    assert array_equal(test, binning(frames, 2, "rgb"))  # one 4x4 superpixel per frame
+    assert test[0].shape == (1, 1, 3) and test[0].dtype == uint16
+    assert meta[-1]["counter"] == 104
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
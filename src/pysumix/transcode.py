@@ -0,0 +1,215 @@
+"""
+demosaic a raw HDF5, TIFF or RawRecorder recording to a new RGB or gray file, a chunk of
+frames at a time, so memory use is bounded by the chunk size rather than the recording length:
+
+    python -m pysumix.transcode raw.h5 rgb.h5
+    python -m pysumix.transcode raw.tif gray.tif --gray -a 2
+    python -m pysumix.transcode raw.h5 small.h5 -b 2
+
+Per-frame frame counter, timestamp, exposure and gain are carried over to the output.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+
+from .binning import binned_shape, bindtype, binning
+from .demosaic import demosaic
+from .record import (
+    H5Recorder,
+    TiffRecorder,
+    TAG_COUNTER,
+    TAG_EXPOSURE,
+    TAG_GAIN,
+    TAG_TIMESTAMP,
+    read_raw,
+)
+
+GAINKEYS = ("g1", "gr", "gg2", "gb")
+
+Chunk = tuple[np.ndarray, list[dict]]
+
+
+def read_chunks(fn: Path | str, chunk: int = 16) -> Iterator[Chunk]:
+    """
+    yield (frames, metadata) of up to chunk raw frames at a time from an HDF5 /images
+    dataset, the pages of a TIFF or a .raw file, with per-frame keyword arguments for Recorder.append
+    """
+    fn = Path(fn).expanduser()
+    ext = fn.suffix.lower()
+    if chunk < 1:
+        raise ValueError("chunk must be at least 1 frame")
+
+    if ext == ".h5":
+        yield from _h5chunks(fn, chunk)
+    elif ext in (".tif", ".tiff"):
+        yield from _tiffchunks(fn, chunk)
+    elif ext == ".raw":
+        yield from _rawchunks(fn, chunk)
+    else:
+        raise ValueError(f"unknown recording type {fn}")
+
+
+def _metadata(k: int, columns: dict) -> list[dict]:
+    """append() keyword arguments of k frames from per-frame metadata arrays, where present"""
+    meta: list[dict] = [{} for _ in range(k)]
+
+    if "framecounter" in columns:
+        for m, c in zip(meta, columns["framecounter"]):
+            m["counter"] = None if c < 0 else int(c)
+    for name in ("timestamp", "exposure"):
+        if name in columns:
+            for m, v in zip(meta, columns[name]):
+                m[name] = None if np.isnan(v) else float(v)
+    if "gain" in columns:
+        for m, g in zip(meta, columns["gain"]):
+            m["gain"] = None if (g < 0).all() else dict(zip(GAINKEYS, g.tolist()))
+
+    return meta
+
+
+def _h5chunks(fn: Path, chunk: int) -> Iterator[Chunk]:
+    import h5py
+
+    with h5py.File(fn, "r") as f:
+        images = f["/images"]
+        for i in range(0, images.shape[0], chunk):
+            frames = images[i : i + chunk]
+            k = frames.shape[0]
+            columns = {
+                name: f[name][i : i + k]
+                for name in ("framecounter", "timestamp", "exposure", "gain")
+                if name in f
+            }
+            yield frames, _metadata(k, columns)
+
+
+def _rawchunks(fn: Path, chunk: int) -> Iterator[Chunk]:
+    images, index, _ = read_raw(fn)
+    for i in range(0, images.shape[0], chunk):
+        frames = np.asarray(images[i : i + chunk])
+        k = frames.shape[0]
+        columns = {}
+        if index is not None:
+            ix = index[i : i + k]
+            columns = {name: ix[name] for name in ("timestamp", "exposure", "gain")}
+            columns["framecounter"] = ix["counter"]
+        yield frames, _metadata(k, columns)
+
+
+def _tiffchunks(fn: Path, chunk: int) -> Iterator[Chunk]:
+    import tifffile
+
+    def tag(page, code):
+        t = page.tags.get(code)
+        return None if t is None else t.value
+
+    with tifffile.TiffFile(fn) as tif:
+        pages = tif.pages
+        for i in range(0, len(pages), chunk):
+            batch = [pages[j] for j in range(i, min(i + chunk, len(pages)))]
+            frames = np.stack([p.asarray() for p in batch])
+
+            meta = []
+            for p in batch:
+                gain = tag(p, TAG_GAIN)
+                meta.append(
+                    {
+                        "counter": tag(p, TAG_COUNTER),
+                        "timestamp": tag(p, TAG_TIMESTAMP),
+                        "exposure": tag(p, TAG_EXPOSURE),
+                        "gain": None if gain is None else dict(zip(GAINKEYS, map(int, gain))),
+                    }
+                )
+
+            yield frames, meta
+
+
+def transcode(
+    infn: Path | str,
+    outfn: Path | str,
+    alg: int = 1,
+    color: bool = True,
+    chunk: int = 16,
+    workers: int | None = 1,
+    compression: str | None = None,
+    nbin: int = 1,
+) -> int:
+    """
+    demosaic the raw recording infn to outfn (.h5 or .tif), returning the number of frames.
+
+    alg, color, workers: as demosaic()
+    chunk: frames read, demosaiced and written at a time
+    compression: output compression, as H5Recorder ("lzf" default) or TiffRecorder (none default)
+    nbin: if > 1, instead of demosaicing, bin nbin x nbin sites of each color into one RGB
+        (or gray) pixel per 2nbin x 2nbin superpixel, in a wider dtype; see binning()
+    """
+    outfn = Path(outfn).expanduser()
+    ext = outfn.suffix.lower()
+    if ext not in (".h5", ".tif", ".tiff"):
+        raise ValueError(f"unknown output type {outfn}")
+
+    rec: H5Recorder | TiffRecorder | None = None
+    out = np.empty(0)  # sized from the first chunk
+    mode = "rgb" if color else "gray"  # for binning
+    n = 0
+    try:
+        for frames, meta in read_chunks(infn, chunk):
+            if rec is None:
+                if nbin > 1:
+                    shape = binned_shape(frames.shape[1:], nbin, mode)
+                    dtype = bindtype(frames.dtype, nbin, mode)
+                else:
+                    shape = frames.shape[1:] + (3,) if color else frames.shape[1:]
+                    dtype = frames.dtype
+                if ext == ".h5":
+                    rec = H5Recorder(
+                        outfn,
+                        shape,
+                        dtype,
+                        compression="lzf" if compression is None else compression,
+                        chunkframes=min(chunk, 16),
+                    )
+                else:
+                    rec = TiffRecorder(outfn, shape, dtype, compression=compression)
+                # one output buffer reused for every chunk
+                out = np.empty((chunk,) + shape, dtype=dtype)
+
+            k = frames.shape[0]
+            if nbin > 1:
+                proc = binning(frames, nbin, mode, out=out[:k])
+            else:
+                proc = demosaic(frames, "", alg, color, out=out[:k], workers=workers)
+            for image, m in zip(proc, meta):
+                rec.append(image, **m)
+            n += k
+    finally:
+        if rec is not None:
+            rec.close()
+
+    return n
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    p = ArgumentParser(description="demosaic a raw HDF5, TIFF or .raw recording chunk by chunk")
+    p.add_argument("infn", help="raw recording .h5, .tif or .raw")
+    p.add_argument("outfn", help="output .h5 or .tif")
+    p.add_argument("-a", "--alg", help="demosaic algorithm", type=int, default=1)
+    p.add_argument("--gray", help="write grayscale instead of RGB", action="store_true")
+    p.add_argument("-c", "--chunk", help="frames per chunk", type=int, default=16)
+    p.add_argument(
+        "-j", "--workers", help="demosaic threads, 0 for one per CPU", type=int, default=1
+    )
+    p.add_argument("--compression", help="output compression")
+    p.add_argument("-b", "--bin", help="bin NxN sites per color instead of demosaic", type=int)
+    P = p.parse_args()
+
+    n = transcode(
+        P.infn, P.outfn, P.alg, not P.gray, P.chunk, P.workers or None, P.compression, P.bin or 1
+    )
+    print(f"{n} frames written to {P.outfn}")